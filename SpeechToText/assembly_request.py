@@ -1,5 +1,9 @@
 import assemblyai as aai
+import audioop
 import os
+import time
+import wave
+from io import BytesIO
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,19 +12,123 @@ aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
 # audio_file = "./example.mp3"
 # Or use a publicly-accessible URL:
 
-def transcribe_audio(audio_file, output_file, speackers_expected=2):
+# Transcription backends resample to 16 kHz mono internally, so anything
+# above that is wasted bytes on the wire
+TARGET_RATE = 16000
+
+def downsample_wav(audio_file):
+    """
+    Downsample a local WAV file to 16 kHz mono for upload
+
+    The downsampled WAV is built in memory and streamed straight to the
+    upload, so no intermediate file ever touches disk.
+
+    Args:
+        audio_file (str): Path to the WAV file
+
+    Returns:
+        io.BytesIO or str: In-memory WAV buffer, or the original path if
+            the file is already at or below the target rate
+    """
+    with wave.open(audio_file, 'rb') as wf:
+        channels = wf.getnchannels()
+        sampwidth = wf.getsampwidth()
+        rate = wf.getframerate()
+        if rate <= TARGET_RATE and channels == 1:
+            return audio_file
+        frames = wf.readframes(wf.getnframes())
+
+    # Mix down to mono and resample to the target rate
+    if channels > 1:
+        frames = audioop.tomono(frames, sampwidth, 0.5, 0.5)
+    frames, _ = audioop.ratecv(frames, sampwidth, 1, rate, TARGET_RATE, None)
+
+    buffer = BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(sampwidth)
+        wf.setframerate(TARGET_RATE)
+        wf.writeframes(frames)
+    buffer.seek(0)
+
+    return buffer
+
+def transcribe_audio(audio_file, output_file=None, speackers_expected=2):
     config = aai.TranscriptionConfig(
         speaker_labels=False
     )
+    # Shrink local WAV uploads to 16 kHz mono - the upload is network-bound.
+    # The transcriber accepts the in-memory buffer directly, so the
+    # downsampled audio is never written to disk.
+    if isinstance(audio_file, str) and os.path.isfile(audio_file) and audio_file.lower().endswith('.wav'):
+        audio_file = downsample_wav(audio_file)
     transcript = aai.Transcriber().transcribe(audio_file, config)
     
     # Since we're not using speaker labels, we'll just get the full transcript
     transcription_text = transcript.text
-    print(f"Transcription: {transcription_text}")
-    
-    # Write the transcription to the output file
-    with open(output_file, "w") as f:
-        f.write(transcription_text)
-    
+
+    # Write the transcription to the output file only when one is requested -
+    # callers that just want the text skip the disk round-trip
+    if output_file:
+        with open(output_file, "w") as f:
+            f.write(transcription_text)
+
     # Return the transcription as a single string instead of a list of dialogues
+    return transcription_text
+
+def transcribe_streaming(recording_manager, output_file=None, hop_s=5):
+    """
+    Transcribe a live recording in rolling windows instead of one monolithic upload
+
+    Drains new audio out of the RecordingManager buffer every hop_s seconds
+    and streams it to AssemblyAI's real-time endpoint, so transcription
+    overlaps capture and a network hiccup only retries one window instead
+    of the whole session.
+
+    Args:
+        recording_manager (RecordingManager): The active recording manager
+        output_file (str, optional): File to write the transcription to
+        hop_s (int): Seconds between audio submissions
+
+    Returns:
+        str: The concatenated committed transcription text
+    """
+    committed_text = []
+
+    def on_data(transcript):
+        # Only keep finalized segments; partials get revised
+        if isinstance(transcript, aai.RealtimeFinalTranscript) and transcript.text:
+            committed_text.append(transcript.text)
+
+    def on_error(error):
+        print(f"Streaming transcription error: {error}")
+
+    transcriber = aai.RealtimeTranscriber(
+        sample_rate=recording_manager.RATE,
+        on_data=on_data,
+        on_error=on_error
+    )
+    transcriber.connect()
+
+    def audio_windows():
+        offset = 0
+        while recording_manager.is_currently_recording():
+            data, offset = recording_manager.read_audio(offset)
+            if data:
+                yield data
+            time.sleep(hop_s)
+        # Flush whatever arrived after the last hop
+        data, offset = recording_manager.read_audio(offset)
+        if data:
+            yield data
+
+    transcriber.stream(audio_windows())
+    transcriber.close()
+
+    transcription_text = " ".join(committed_text)
+
+    if output_file:
+        with open(output_file, "w") as f:
+            f.write(transcription_text)
+
     return transcription_text
\ No newline at end of file
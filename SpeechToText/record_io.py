@@ -1,59 +1,92 @@
 import pyaudio
 import wave
-import threading
+from collections import deque
+
+# soundfile writes the WAV through a single libsndfile C call; fall back to
+# the pure-Python wave module when it isn't installed
+try:
+    import numpy as np
+    import soundfile as sf
+except ImportError:
+    sf = None
 
 class RecordingManager:
     # Audio recording parameters
     FORMAT = pyaudio.paInt16  # 16-bit format
     CHANNELS = 1  # Mono
-    RATE = 44100  # Sample rate (Hz)
-    CHUNK = 1024  # Buffer size
+    RATE = 16000  # Sample rate (Hz) - matches speech-to-text ingest rate
+    CHUNK = 512  # Buffer size (~32 ms at 16 kHz)
     DEFAULT_FILENAME = "recorded_audio.wav"
 
-    def __init__(self):
-        self.frames = []
+    def __init__(self, chunk=CHUNK, rate=RATE, max_seconds=None):
+        # Capture parameters are configurable; smaller buffers lower the
+        # capture latency floor, and 16 kHz is what the transcription
+        # service resamples to anyway.
+        self.CHUNK = chunk
+        self.RATE = rate
+        # Optional rolling-window mode: keep only the trailing max_seconds
+        # of audio in a bounded FIFO of callback buffers. deque.maxlen
+        # evicts the oldest chunk on append (atomic under the GIL, so the
+        # capture callback and readers don't need a lock), capping memory
+        # for open-ended sessions.
+        self.max_seconds = max_seconds
+        if max_seconds is not None:
+            chunk_bytes = chunk * 2
+            self._window = deque(maxlen=max(1, (rate * 2 * max_seconds) // chunk_bytes))
+        else:
+            self._window = None
+        # Bytes evicted from the rolling window so far; lets read_audio
+        # report absolute offsets even as the window origin slides
+        self._evicted = 0
+        # Pre-allocated sample buffer (60 s of 16-bit audio), doubled on overflow.
+        # Appending into one bytearray avoids thousands of small bytes objects
+        # and the large b''.join() copy when the recording is saved.
+        self._buf = bytearray(self.RATE * 2 * 60)
+        self._len = 0
         self.is_recording = False
-        self.stop_event = None
-        self.recording_thread = None
-        self.audio = None
+        # One PortAudio instance reused across start/stop cycles; init is
+        # expensive (~100 ms), so don't pay it per recording.
+        self.audio = pyaudio.PyAudio()
         self.stream = None
 
-    def _record_audio(self):
-        """Internal function to record audio until stop_event is set."""
-        self.audio = pyaudio.PyAudio()
+    def _record_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: append the captured buffer and keep streaming."""
+        if self._window is not None:
+            if len(self._window) == self._window.maxlen:
+                # Rolling over: account for the chunk about to be evicted
+                # so reader offsets stay absolute
+                self._evicted += len(self._window[0])
+            self._window.append(bytes(in_data))
+            return (None, pyaudio.paContinue)
+        end = self._len + len(in_data)
+        if end > len(self._buf):
+            # Double the buffer instead of reallocating per chunk
+            self._buf.extend(b'\x00' * len(self._buf))
+        self._buf[self._len:end] = in_data
+        self._len = end
+        return (None, pyaudio.paContinue)
+
+    def start_recording(self):
+        """Start recording audio."""
+        if self.is_recording:
+            return False
+
+        self._len = 0
+        if self._window is not None:
+            self._window.clear()
+        self._evicted = 0
+        # Callback mode: PortAudio captures on its own thread and hands each
+        # buffer to _record_callback, so there is no Python read loop to run.
         self.stream = self.audio.open(
             format=self.FORMAT,
             channels=self.CHANNELS,
             rate=self.RATE,
             input=True,
-            frames_per_buffer=self.CHUNK
+            frames_per_buffer=self.CHUNK,
+            stream_callback=self._record_callback
         )
-
-        while not self.stop_event.is_set():
-            try:
-                data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                self.frames.append(data)
-            except Exception as e:
-                print(f"Error: {e}")
-                break
-
-        # Stop and close the stream
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-        if self.audio:
-            self.audio.terminate()
-
-    def start_recording(self):
-        """Start recording audio."""
-        if self.is_recording:
-            return False
-        
-        self.frames = []
-        self.stop_event = threading.Event()
-        self.recording_thread = threading.Thread(target=self._record_audio)
         self.is_recording = True
-        self.recording_thread.start()
+        self.stream.start_stream()
         return True
 
     def stop_recording(self, filename=DEFAULT_FILENAME):
@@ -61,26 +94,84 @@ class RecordingManager:
         if not self.is_recording:
             return False
 
-        self.stop_event.set()
-        self.recording_thread.join()
+        self.stream.stop_stream()
+        self.stream.close()
+        self.stream = None
         self.is_recording = False
 
         # Save the recorded data to a WAV file
-        if self.frames:
-            with wave.open(filename, 'wb') as wf:
-                audio = pyaudio.PyAudio()
-                wf.setnchannels(self.CHANNELS)
-                wf.setsampwidth(audio.get_sample_size(self.FORMAT))
-                wf.setframerate(self.RATE)
-                wf.writeframes(b''.join(self.frames))
-                audio.terminate()
+        audio_view = self.get_audio_view()
+        if len(audio_view):
+            if sf is not None:
+                # Single C call over a zero-copy int16 view of the buffer
+                sf.write(filename, np.frombuffer(audio_view, dtype=np.int16), self.RATE, subtype='PCM_16')
+            else:
+                with wave.open(filename, 'wb') as wf:
+                    wf.setnchannels(self.CHANNELS)
+                    wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
+                    wf.setframerate(self.RATE)
+                    # Write straight from the recording buffer - no join, no copy
+                    wf.writeframes(audio_view)
             return True
         return False
 
     def is_currently_recording(self):
         """Check if currently recording."""
-        return self.is_recording 
-    
+        return self.is_recording
+
+    def get_audio_view(self):
+        """View over the recorded samples.
+
+        In the default mode this aliases the recording buffer directly, so
+        consumers like wave.writeframes read it without an intermediate
+        copy. In rolling-window mode it is a snapshot of the trailing
+        window, oldest chunk first.
+        """
+        if self._window is not None:
+            return memoryview(b''.join(self._window))
+        return memoryview(self._buf)[:self._len]
+
+    def read_audio(self, start=0):
+        """Copy out the audio recorded since byte offset `start`.
+
+        Lets a streaming transcriber drain new audio while the recording
+        is still in progress. Offsets are absolute byte positions since
+        the recording started, so they keep advancing in rolling-window
+        mode as old chunks are evicted; audio that has already fallen out
+        of the window is skipped.
+
+        Returns:
+            tuple: (bytes of new audio, new offset to resume from)
+        """
+        if self._window is not None:
+            # Snapshot the window together with its absolute origin.
+            # Retry if the capture callback evicts (or mutates the deque)
+            # mid-snapshot so origin and contents stay consistent.
+            while True:
+                try:
+                    origin = self._evicted
+                    snapshot = b''.join(self._window)
+                    if self._evicted == origin:
+                        break
+                except RuntimeError:
+                    continue
+            if start < origin:
+                # The caller fell behind the window; resume at its edge
+                start = origin
+            return snapshot[start - origin:], origin + len(snapshot)
+        # Slice-copy the bytearray directly instead of holding a
+        # memoryview export: the callback's buffer doubling extend()
+        # raises BufferError while any export of _buf is alive, which
+        # would abort capture mid-recording
+        end = self._len
+        return bytes(self._buf[start:end]), end
+
+    def close(self):
+        """Release the PortAudio instance on shutdown."""
+        if self.audio:
+            self.audio.terminate()
+            self.audio = None
+
 if __name__ == "__main__":
     recording_manager = RecordingManager()
     input("Press Enter to start recording...")
@@ -1,8 +1,14 @@
 import re
 import json
 from datetime import datetime
+from io import StringIO
 from utils.query_model import query_model
 
+# Shared empty defaults so .get() misses don't allocate a fresh {} / []
+# on every report
+_EMPTY_DICT = {}
+_EMPTY_LIST = ()
+
 class DocumentationAgent:
     def __init__(self, model="o1-mini", api_key=None):
         """
@@ -83,116 +89,128 @@ class DocumentationAgent:
     
     def _format_data(self, case_id, timestamp, clinical_data, nurse_assessment, physician_assessment, esi_result):
         """Format all data for the prompt"""
-        formatted = []
-        
+        # Write into a single StringIO buffer instead of accumulating a list
+        # of line strings and joining them at the end
+        buffer = StringIO()
+        write = buffer.write
+
+        # Bind the dict lookups once rather than re-resolving .get on every line
+        clinical_get = clinical_data.get
+        nurse_get = nurse_assessment.get
+        physician_get = physician_assessment.get
+        esi_get = esi_result.get
+
         # Add case information
-        formatted.append(f"CASE ID: {case_id}")
-        formatted.append(f"TIMESTAMP: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
-        
+        write(f"CASE ID: {case_id}\n")
+        # isoformat is a C-level fast path and renders the same
+        # "YYYY-MM-DD HH:MM:SS" layout without strftime format parsing
+        write(f"TIMESTAMP: {timestamp.isoformat(sep=' ', timespec='seconds')}\n")
+
         # Add patient information
-        formatted.append("\nPATIENT INFORMATION:")
-        formatted.append(f"Age: {clinical_data.get('age', 'Unknown')}")
-        formatted.append(f"Gender: {clinical_data.get('gender', 'Unknown')}")
-        
+        write("\nPATIENT INFORMATION:\n")
+        write(f"Age: {clinical_get('age', 'Unknown')}\n")
+        write(f"Gender: {clinical_get('gender', 'Unknown')}\n")
+
         # Add clinical data
-        formatted.append("\nCLINICAL DATA:")
-        formatted.append(f"Chief Complaint: {clinical_data.get('chief_complaint', 'Unknown')}")
-        
+        write("\nCLINICAL DATA:\n")
+        write(f"Chief Complaint: {clinical_get('chief_complaint', 'Unknown')}\n")
+
         # Add vital signs
-        vitals = clinical_data.get('vital_signs', {})
+        vitals = clinical_get('vital_signs') or _EMPTY_DICT
         if vitals:
-            formatted.append("Vital Signs:")
+            write("Vital Signs:\n")
             if 'temperature' in vitals:
-                formatted.append(f"- Temperature: {vitals['temperature']}°C")
+                write(f"- Temperature: {vitals['temperature']}°C\n")
             if 'heart_rate' in vitals:
-                formatted.append(f"- Heart Rate: {vitals['heart_rate']} bpm")
+                write(f"- Heart Rate: {vitals['heart_rate']} bpm\n")
             if 'respiratory_rate' in vitals:
-                formatted.append(f"- Respiratory Rate: {vitals['respiratory_rate']} breaths/min")
+                write(f"- Respiratory Rate: {vitals['respiratory_rate']} breaths/min\n")
             if 'blood_pressure_systolic' in vitals and 'blood_pressure_diastolic' in vitals:
-                formatted.append(f"- Blood Pressure: {vitals['blood_pressure_systolic']}/{vitals['blood_pressure_diastolic']} mmHg")
+                write(f"- Blood Pressure: {vitals['blood_pressure_systolic']}/{vitals['blood_pressure_diastolic']} mmHg\n")
             if 'oxygen_saturation' in vitals:
-                formatted.append(f"- Oxygen Saturation: {vitals['oxygen_saturation']}%")
+                write(f"- Oxygen Saturation: {vitals['oxygen_saturation']}%\n")
             if 'pain_level' in vitals:
-                formatted.append(f"- Pain Level: {vitals['pain_level']}/10")
-        
+                write(f"- Pain Level: {vitals['pain_level']}/10\n")
+
         # Add symptoms
-        symptoms = clinical_data.get('symptoms', [])
+        symptoms = clinical_get('symptoms') or _EMPTY_LIST
         if symptoms:
-            formatted.append("\nSymptoms:")
+            write("\nSymptoms:\n")
             for symptom in symptoms:
-                formatted.append(f"- {symptom}")
-        
+                write(f"- {symptom}\n")
+
         # Add medical history
-        history = clinical_data.get('medical_history', [])
+        history = clinical_get('medical_history') or _EMPTY_LIST
         if history:
-            formatted.append("\nMedical History:")
+            write("\nMedical History:\n")
             for item in history:
-                formatted.append(f"- {item}")
-        
+                write(f"- {item}\n")
+
         # Add allergies
-        allergies = clinical_data.get('allergies', [])
+        allergies = clinical_get('allergies') or _EMPTY_LIST
         if allergies:
-            formatted.append("\nAllergies:")
+            write("\nAllergies:\n")
             for allergy in allergies:
-                formatted.append(f"- {allergy}")
-        
+                write(f"- {allergy}\n")
+
         # Add medications
-        medications = clinical_data.get('medications', [])
+        medications = clinical_get('medications') or _EMPTY_LIST
         if medications:
-            formatted.append("\nMedications:")
+            write("\nMedications:\n")
             for medication in medications:
-                formatted.append(f"- {medication}")
-        
+                write(f"- {medication}\n")
+
         # Add nurse assessment
-        formatted.append("\nTRIAGE NURSE ASSESSMENT:")
-        formatted.append(f"Initial Impression: {nurse_assessment.get('initial_impression', 'Not provided')}")
-        formatted.append(f"Vital Signs Assessment: {nurse_assessment.get('vital_signs_assessment', 'Not provided')}")
-        formatted.append(f"Chief Complaint Severity: {nurse_assessment.get('chief_complaint_severity', 'Not provided')}")
-        formatted.append(f"Estimated Resource Needs: {nurse_assessment.get('resource_needs', 'Not provided')}")
-        formatted.append(f"Recommended ESI Level: {nurse_assessment.get('recommended_esi', 'Not provided')}")
-        formatted.append(f"Rationale: {nurse_assessment.get('rationale', 'Not provided')}")
-        
+        write("\nTRIAGE NURSE ASSESSMENT:\n")
+        write(f"Initial Impression: {nurse_get('initial_impression', 'Not provided')}\n")
+        write(f"Vital Signs Assessment: {nurse_get('vital_signs_assessment', 'Not provided')}\n")
+        write(f"Chief Complaint Severity: {nurse_get('chief_complaint_severity', 'Not provided')}\n")
+        write(f"Estimated Resource Needs: {nurse_get('resource_needs', 'Not provided')}\n")
+        write(f"Recommended ESI Level: {nurse_get('recommended_esi', 'Not provided')}\n")
+        write(f"Rationale: {nurse_get('rationale', 'Not provided')}\n")
+
         # Add physician assessment
-        formatted.append("\nEMERGENCY PHYSICIAN ASSESSMENT:")
-        formatted.append(f"Clinical Assessment: {physician_assessment.get('clinical_assessment', 'Not provided')}")
-        
+        write("\nEMERGENCY PHYSICIAN ASSESSMENT:\n")
+        write(f"Clinical Assessment: {physician_get('clinical_assessment', 'Not provided')}\n")
+
         # Add potential diagnoses
-        diagnoses = physician_assessment.get('potential_diagnoses', [])
+        diagnoses = physician_get('potential_diagnoses') or _EMPTY_LIST
         if diagnoses:
-            formatted.append("Potential Diagnoses:")
+            write("Potential Diagnoses:\n")
             for i, diagnosis in enumerate(diagnoses, 1):
-                formatted.append(f"{i}. {diagnosis}")
-        
-        formatted.append(f"ESI Level Assessment: {physician_assessment.get('esi_level', 'Not provided')}")
-        
+                write(f"{i}. {diagnosis}\n")
+
+        write(f"ESI Level Assessment: {physician_get('esi_level', 'Not provided')}\n")
+
         # Add immediate actions
-        actions = physician_assessment.get('immediate_actions', [])
+        actions = physician_get('immediate_actions') or _EMPTY_LIST
         if actions:
-            formatted.append("Immediate Actions:")
+            write("Immediate Actions:\n")
             for i, action in enumerate(actions, 1):
-                formatted.append(f"{i}. {action}")
-        
+                write(f"{i}. {action}\n")
+
         # Add diagnostic studies
-        studies = physician_assessment.get('diagnostic_studies', [])
+        studies = physician_get('diagnostic_studies') or _EMPTY_LIST
         if studies:
-            formatted.append("Diagnostic Studies:")
+            write("Diagnostic Studies:\n")
             for i, study in enumerate(studies, 1):
-                formatted.append(f"{i}. {study}")
-        
-        formatted.append(f"Risk Assessment: {physician_assessment.get('risk_assessment', 'Not provided')}")
-        formatted.append(f"Disposition: {physician_assessment.get('disposition', 'Not provided')}")
-        
+                write(f"{i}. {study}\n")
+
+        write(f"Risk Assessment: {physician_get('risk_assessment', 'Not provided')}\n")
+        write(f"Disposition: {physician_get('disposition', 'Not provided')}\n")
+
         # Add ESI result
-        formatted.append("\nFINAL ESI CLASSIFICATION:")
-        formatted.append(f"ESI Level: {esi_result.get('level', 'Not determined')}")
-        formatted.append(f"Confidence: {esi_result.get('confidence', 'N/A')}%")
-        formatted.append(f"Justification: {esi_result.get('justification', 'Not provided')}")
-        
+        write("\nFINAL ESI CLASSIFICATION:\n")
+        write(f"ESI Level: {esi_get('level', 'Not determined')}\n")
+        write(f"Confidence: {esi_get('confidence', 'N/A')}%\n")
+        write(f"Justification: {esi_get('justification', 'Not provided')}\n")
+
         # Add recommended actions
-        actions = esi_result.get('recommended_actions', [])
+        actions = esi_get('recommended_actions') or _EMPTY_LIST
         if actions:
-            formatted.append("Recommended Actions:")
+            write("Recommended Actions:\n")
             for i, action in enumerate(actions, 1):
-                formatted.append(f"{i}. {action}")
-        
-        return "\n".join(formatted) 
\ No newline at end of file
+                write(f"{i}. {action}\n")
+
+        # Drop the trailing newline so output matches the old "\n".join format
+        return buffer.getvalue()[:-1] 
\ No newline at end of file
@@ -1,10 +1,57 @@
 import re
+from concurrent.futures import ThreadPoolExecutor
 from utils.query_model import query_model
 from utils.esi_examples import load_esi_examples, format_examples_for_prompt
+from utils.esi_prompt import ESI_REFERENCE_TEXT
+from pydantic import TypeAdapter
 from utils.schema import EmergencyAssessment
 from utils.structured_parser import parse_structured_output
+from utils.agent_discussion import format_assessment_blocks
+
+# Precompiled patterns for _parse_assessment - compiled once at import
+# instead of on every response
+SECTION_SPLIT_PATTERN = re.compile(
+    r'([1-7])\.\s*(?:Clinical Assessment|Potential Diagnoses[^:\n]*|ESI Level[^:\n]*|'
+    r'Immediate Actions[^:\n]*|Diagnostic Studies[^:\n]*|Risk Assessment|Disposition[^:\n]*):'
+)
+LIST_ITEM_PATTERN = re.compile(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', re.DOTALL)
+JSON_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(\{.*\})\s*```', re.DOTALL)
+
+# Shared worker pool for firing assessments without blocking the caller
+_executor = ThreadPoolExecutor(max_workers=2)
+
+def _extract_list_items(text):
+    """Pull bullet/numbered items out of a section with the shared pattern"""
+    return [item.strip() for item in LIST_ITEM_PATTERN.findall(text) if item.strip()]
+
+# Validator built once at import - validate_json parses and validates in
+# a single pass instead of rebuilding schema machinery per response
+_ASSESSMENT_ADAPTER = TypeAdapter(EmergencyAssessment)
+
+def _parse_json_response(response):
+    """Parse a JSON assessment response locally, or None if it is malformed"""
+    match = JSON_FENCE_PATTERN.search(response)
+    if match:
+        raw = match.group(1)
+    else:
+        # Take the outermost braces in case the model added prose around them
+        start, end = response.find('{'), response.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        raw = response[start:end + 1]
+
+    try:
+        # Validate against the schema so malformed output falls through to
+        # the extraction model instead of propagating bad data
+        return _ASSESSMENT_ADAPTER.validate_json(raw).model_dump()
+    except Exception:
+        return None
 
 class EmergencyPhysicianAgent:
+    # Cached system prompt shared by all instances - the ESI examples are
+    # selected with a fixed seed, so the prompt is identical across calls
+    _system_prompt_cache = None
+
     def __init__(self, model="gpt-4o-mini", api_key=None):
         """
         Initialize the Emergency Physician Agent
@@ -30,42 +77,73 @@ class EmergencyPhysicianAgent:
         # Create a system prompt for the emergency physician role
         system_prompt = self._get_system_prompt()
         
-        # Create the user prompt
+        # Create the user prompt - ask for JSON directly so the response can
+        # be parsed locally instead of via a second extraction LLM call. The
+        # static instructions come before the conversation so the prompt
+        # prefix stays identical across cases for provider-side caching.
         user_prompt = f"""
-        Please perform a detailed emergency physician assessment based on the following patient-nurse conversation:
-        
+        Please perform a detailed emergency physician assessment of the patient-nurse conversation below.
+
+        Respond with a single JSON object using exactly these keys:
+        {{
+            "clinical_assessment": "<detailed clinical assessment>",
+            "potential_diagnoses": ["<diagnoses in order of likelihood>"],
+            "esi_level": "<ESI level recommendation>",
+            "immediate_actions": ["<at least 3 specific actions/interventions>"],
+            "diagnostic_studies": ["<specific diagnostic studies>"],
+            "risk_assessment": "<risk assessment>",
+            "disposition": "<disposition recommendation>",
+            "summary": "<one-sentence summary including the ESI level>"
+        }}
+
+        The conversation is:
+
         {conversation_text}
-        
-        Provide your assessment in the following format:
-        1. Clinical Assessment:
-        2. Potential Diagnoses (in order of likelihood):
-        3. ESI Level Recommendation:
-        4. Immediate Actions/Interventions (list at least 3 specific actions):
-        5. Diagnostic Studies (be specific):
-        6. Risk Assessment:
-        7. Disposition Recommendation:
         """
-        
+
         # Query the model
         response = query_model(
             model_str=self.model,
             system_prompt=system_prompt,
             prompt=user_prompt,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            max_tokens=800
         )
-        
-        # Parse the response
-        assessment = parse_structured_output(response, EmergencyAssessment)
-        
+
+        # Parse the JSON locally; only fall back to the extraction model if
+        # the response is malformed
+        assessment = _parse_json_response(response)
+        if assessment is None:
+            assessment = parse_structured_output(response, EmergencyAssessment)
+
         return assessment
-    
-    def respond_to_assessments(self, conversation_text, assessments):
+
+    def assess_conversation_async(self, conversation_text):
+        """
+        Fire the assessment on a worker thread and return immediately
+
+        The generation call and the structured-extraction call are data
+        dependent (the parser consumes the generated text), so they cannot
+        overlap with each other - but the whole pair can overlap with other
+        agents' assessments when the caller runs several concurrently.
+
+        Args:
+            conversation_text (str): The nurse-patient conversation
+
+        Returns:
+            concurrent.futures.Future: Resolves to the assessment dict
+        """
+        return _executor.submit(self.assess_conversation, conversation_text)
+
+    def respond_to_assessments(self, conversation_text, assessments, formatted_blocks=None):
         """
         Respond to other agents' assessments
         
         Args:
             conversation_text (str): The nurse-patient conversation
             assessments (dict): Assessments from all agents
+            formatted_blocks (dict, optional): Pre-formatted assessment
+                blocks keyed by role, as built by format_assessment_blocks
             
         Returns:
             str: Response to other assessments
@@ -83,18 +161,14 @@ class EmergencyPhysicianAgent:
         Be professional but direct in your assessment. Your primary concern is accurate diagnosis and appropriate treatment.
         """
         
-        # Format the assessments for the prompt
-        formatted_assessments = []
-        for role, assessment in assessments.items():
-            if role != self.role:  # Don't include own assessment
-                formatted_assessments.append(f"{role} Assessment:")
-                if isinstance(assessment, dict):
-                    for key, value in assessment.items():
-                        formatted_assessments.append(f"- {key}: {value}")
-                else:
-                    formatted_assessments.append(f"- {assessment}")
-        
-        formatted_assessments_text = "\n".join(formatted_assessments)
+        # Format the assessments for the prompt, reusing blocks the
+        # discussion controller already built when available (own
+        # assessment excluded)
+        if formatted_blocks is None:
+            formatted_blocks = format_assessment_blocks(assessments)
+        formatted_assessments_text = "\n".join(
+            block for role, block in formatted_blocks.items() if role != self.role
+        )
         
         # Create the user prompt
         user_prompt = f"""
@@ -114,7 +188,8 @@ class EmergencyPhysicianAgent:
             model_str=self.model,
             system_prompt=system_prompt,
             prompt=user_prompt,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            max_tokens=500
         )
         
         return response
@@ -132,47 +207,34 @@ class EmergencyPhysicianAgent:
             "summary": ""  # Add a summary field
         }
         
-        # Extract sections using regex
-        clinical_match = re.search(r'1\.\s*Clinical Assessment:(.*?)(?=2\.|\Z)', response, re.DOTALL)
-        if clinical_match:
-            assessment["clinical_assessment"] = clinical_match.group(1).strip()
-        
-        diagnoses_match = re.search(r'2\.\s*Potential Diagnoses.*?:(.*?)(?=3\.|\Z)', response, re.DOTALL)
-        if diagnoses_match:
-            diagnoses_text = diagnoses_match.group(1).strip()
-            # Extract diagnoses as a list
-            diagnoses_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', diagnoses_text, re.DOTALL)
-            assessment["potential_diagnoses"] = [d.strip() for d in diagnoses_list if d.strip()]
-        
-        esi_match = re.search(r'3\.\s*ESI Level.*?:(.*?)(?=4\.|\Z)', response, re.DOTALL)
-        if esi_match:
-            assessment["esi_level"] = esi_match.group(1).strip()
-        
-        actions_match = re.search(r'4\.\s*Immediate Actions.*?:(.*?)(?=5\.|\Z)', response, re.DOTALL)
-        if actions_match:
-            actions_text = actions_match.group(1).strip()
-            # Extract actions as a list
-            actions_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', actions_text, re.DOTALL)
-            assessment["immediate_actions"] = [a.strip() for a in actions_list if a.strip()]
-        
-        studies_match = re.search(r'5\.\s*Diagnostic Studies.*?:(.*?)(?=6\.|\Z)', response, re.DOTALL)
-        if studies_match:
-            studies_text = studies_match.group(1).strip()
-            # Extract studies as a list
-            studies_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', studies_text, re.DOTALL)
-            assessment["diagnostic_studies"] = [s.strip() for s in studies_list if s.strip()]
-        
-        risk_match = re.search(r'6\.\s*Risk Assessment:(.*?)(?=7\.|\Z)', response, re.DOTALL)
-        if risk_match:
-            assessment["risk_assessment"] = risk_match.group(1).strip()
-        
-        disposition_match = re.search(r'7\.\s*Disposition.*?:(.*?)(?=\Z)', response, re.DOTALL)
-        if disposition_match:
-            assessment["disposition"] = disposition_match.group(1).strip()
-        
+        # Map section numbers to assessment fields and whether they hold a list
+        section_map = {
+            "1": ("clinical_assessment", False),
+            "2": ("potential_diagnoses", True),
+            "3": ("esi_level", False),
+            "4": ("immediate_actions", True),
+            "5": ("diagnostic_studies", True),
+            "6": ("risk_assessment", False),
+            "7": ("disposition", False)
+        }
+
+        # Split the response on the numbered section headings in a single pass
+        # instead of running one regex scan per section
+        parts = SECTION_SPLIT_PATTERN.split(response)
+
+        for i in range(1, len(parts) - 1, 2):
+            field, is_list = section_map.get(parts[i], (None, False))
+            if not field:
+                continue
+            content = parts[i + 1].strip()
+            if is_list:
+                assessment[field] = _extract_list_items(content)
+            else:
+                assessment[field] = content
+
         # Extract ESI level from the esi_level field
-        esi_digit_match = re.search(r'(\d+)', assessment["esi_level"])
-        esi_level = esi_digit_match.group(1) if esi_digit_match else ""
+        # A character scan is all this needs - ESI levels are single digits
+        esi_level = next((c for c in assessment["esi_level"] if c.isdigit()), "")
         
         # Create a summary for display in the discussion
         assessment["summary"] = f"ESI Level: {esi_level}. Assessment: {assessment['clinical_assessment'][:100]}..."
@@ -181,6 +243,11 @@ class EmergencyPhysicianAgent:
     
     def _get_system_prompt(self):
         """Get the system prompt for the emergency physician agent"""
+        # Reuse the cached prompt instead of reloading and reformatting the
+        # ESI examples on every assessment
+        if EmergencyPhysicianAgent._system_prompt_cache is not None:
+            return EmergencyPhysicianAgent._system_prompt_cache
+
         # Load ESI examples - one per level
         esi_examples = load_esi_examples(num_per_level=1)
         
@@ -204,16 +271,12 @@ class EmergencyPhysicianAgent:
         
         Your assessment should demonstrate advanced clinical reasoning and specific medical decision-making relevant to emergency care.
         
-        EMERGENCY SEVERITY INDEX (ESI) REFERENCE:
-        - ESI Level 1: Requires immediate life-saving intervention
-        - ESI Level 2: High-risk situation, severe pain/distress, or vital sign abnormalities
-        - ESI Level 3: Requires multiple resources but stable vital signs
-        - ESI Level 4: Requires one resource
-        - ESI Level 5: Requires no resources
+        {esi_reference}
         
         REFERENCE EXAMPLES:
         
         {examples}
         """
-        
-        return base_prompt.format(examples=examples_text) 
\ No newline at end of file
+
+        EmergencyPhysicianAgent._system_prompt_cache = base_prompt.format(esi_reference=ESI_REFERENCE_TEXT, examples=examples_text)
+        return EmergencyPhysicianAgent._system_prompt_cache
\ No newline at end of file
@@ -1,10 +1,50 @@
 import re
 from utils.query_model import query_model
 from utils.esi_examples import load_esi_examples, format_examples_for_prompt
+from utils.esi_prompt import ESI_REFERENCE_TEXT
+from pydantic import TypeAdapter
 from utils.schema import ConsultantAssessment
 from utils.structured_parser import parse_structured_output
+from utils.agent_discussion import format_assessment_blocks
+
+# Precompiled patterns for _parse_assessment - compiled once at import
+# instead of on every response
+SECTION_SPLIT_PATTERN = re.compile(
+    r'([1-6])\.\s*(?:Specialist Impression|Differential Considerations[^:\n]*|'
+    r'ESI Level Evaluation|Specialized Recommendations[^:\n]*|'
+    r'Potential Pitfalls/Concerns|Additional Insights):'
+)
+LIST_ITEM_PATTERN = re.compile(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', re.DOTALL)
+JSON_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(\{.*\})\s*```', re.DOTALL)
+
+# Validator built once at import - validate_json parses and validates in
+# a single pass instead of rebuilding schema machinery per response
+_ASSESSMENT_ADAPTER = TypeAdapter(ConsultantAssessment)
+
+def _parse_json_response(response):
+    """Parse a JSON assessment response locally, or None if it is malformed"""
+    match = JSON_FENCE_PATTERN.search(response)
+    if match:
+        raw = match.group(1)
+    else:
+        # Take the outermost braces in case the model added prose around them
+        start, end = response.find('{'), response.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        raw = response[start:end + 1]
+
+    try:
+        # Validate against the schema so malformed output falls through to
+        # the extraction model instead of propagating bad data
+        return _ASSESSMENT_ADAPTER.validate_json(raw).model_dump()
+    except Exception:
+        return None
 
 class MedicalConsultantAgent:
+    # Cached system prompt shared by all instances - the ESI examples are
+    # selected with a fixed seed, so the prompt is identical across calls
+    _system_prompt_cache = None
+
     def __init__(self, model="gpt-4o-mini", api_key=None):
         """
         Initialize the Medical Consultant Agent
@@ -30,19 +70,27 @@ class MedicalConsultantAgent:
         # Create a system prompt for the medical consultant role
         system_prompt = self._get_system_prompt()
         
-        # Create the user prompt
+        # Create the user prompt - ask for JSON directly so the response can
+        # be parsed locally instead of via a second extraction LLM call. The
+        # static instructions come before the conversation so the prompt
+        # prefix stays identical across cases for provider-side caching.
         user_prompt = f"""
-        Please provide a specialized medical consultant assessment based on the following patient-nurse conversation:
-        
+        Please provide a specialized medical consultant assessment of the patient-nurse conversation below.
+
+        Respond with a single JSON object using exactly these keys:
+        {{
+            "specialist_impression": "<specialist impression>",
+            "differential_considerations": ["<differentials including rare but critical diagnoses>"],
+            "esi_evaluation": "<ESI level evaluation>",
+            "specialized_recommendations": ["<at least 3-4 specific actions>"],
+            "potential_pitfalls": "<potential pitfalls/concerns>",
+            "additional_insights": "<additional insights>",
+            "summary": "<one-sentence summary including the ESI level>"
+        }}
+
+        The conversation is:
+
         {conversation_text}
-        
-        Provide your assessment in the following format:
-        1. Specialist Impression:
-        2. Differential Considerations (including rare but critical diagnoses):
-        3. ESI Level Evaluation:
-        4. Specialized Recommendations (list at least 3-4 specific actions):
-        5. Potential Pitfalls/Concerns:
-        6. Additional Insights:
         """
         
         # Query the model
@@ -50,21 +98,27 @@ class MedicalConsultantAgent:
             model_str=self.model,
             system_prompt=system_prompt,
             prompt=user_prompt,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            max_tokens=800
         )
         
-        # Parse the response
-        assessment = parse_structured_output(response, ConsultantAssessment)
-        
+        # Parse the JSON locally; only fall back to the extraction model if
+        # the response is malformed
+        assessment = _parse_json_response(response)
+        if assessment is None:
+            assessment = parse_structured_output(response, ConsultantAssessment)
+
         return assessment
     
-    def respond_to_assessments(self, conversation_text, assessments):
+    def respond_to_assessments(self, conversation_text, assessments, formatted_blocks=None):
         """
         Respond to other agents' assessments
         
         Args:
             conversation_text (str): The nurse-patient conversation
             assessments (dict): Assessments from all agents
+            formatted_blocks (dict, optional): Pre-formatted assessment
+                blocks keyed by role, as built by format_assessment_blocks
             
         Returns:
             str: Response to other assessments
@@ -83,18 +137,14 @@ class MedicalConsultantAgent:
         Be professional but direct in your assessment. Your role is to provide specialized expertise and help reach the most accurate assessment.
         """
         
-        # Format the assessments for the prompt
-        formatted_assessments = []
-        for role, assessment in assessments.items():
-            if role != self.role:  # Don't include own assessment
-                formatted_assessments.append(f"{role} Assessment:")
-                if isinstance(assessment, dict):
-                    for key, value in assessment.items():
-                        formatted_assessments.append(f"- {key}: {value}")
-                else:
-                    formatted_assessments.append(f"- {assessment}")
-        
-        formatted_assessments_text = "\n".join(formatted_assessments)
+        # Format the assessments for the prompt, reusing blocks the
+        # discussion controller already built when available (own
+        # assessment excluded)
+        if formatted_blocks is None:
+            formatted_blocks = format_assessment_blocks(assessments)
+        formatted_assessments_text = "\n".join(
+            block for role, block in formatted_blocks.items() if role != self.role
+        )
         
         # Create the user prompt
         user_prompt = f"""
@@ -115,7 +165,8 @@ class MedicalConsultantAgent:
             model_str=self.model,
             system_prompt=system_prompt,
             prompt=user_prompt,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            max_tokens=500
         )
         
         return response
@@ -132,40 +183,35 @@ class MedicalConsultantAgent:
             "summary": ""  # Add a summary field
         }
         
-        # Extract sections using regex
-        impression_match = re.search(r'1\.\s*Specialist Impression:(.*?)(?=2\.|\Z)', response, re.DOTALL)
-        if impression_match:
-            assessment["specialist_impression"] = impression_match.group(1).strip()
-        
-        differential_match = re.search(r'2\.\s*Differential Considerations.*?:(.*?)(?=3\.|\Z)', response, re.DOTALL)
-        if differential_match:
-            differential_text = differential_match.group(1).strip()
-            # Extract differential diagnoses as a list
-            differential_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', differential_text, re.DOTALL)
-            assessment["differential_considerations"] = [d.strip() for d in differential_list if d.strip()]
-        
-        esi_match = re.search(r'3\.\s*ESI Level Evaluation:(.*?)(?=4\.|\Z)', response, re.DOTALL)
-        if esi_match:
-            assessment["esi_evaluation"] = esi_match.group(1).strip()
-        
-        recommendations_match = re.search(r'4\.\s*Specialized Recommendations:(.*?)(?=5\.|\Z)', response, re.DOTALL)
-        if recommendations_match:
-            recommendations_text = recommendations_match.group(1).strip()
-            # Extract recommendations as a list
-            recommendations_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', recommendations_text, re.DOTALL)
-            assessment["specialized_recommendations"] = [r.strip() for r in recommendations_list if r.strip()]
-        
-        pitfalls_match = re.search(r'5\.\s*Potential Pitfalls/Concerns:(.*?)(?=6\.|\Z)', response, re.DOTALL)
-        if pitfalls_match:
-            assessment["potential_pitfalls"] = pitfalls_match.group(1).strip()
-        
-        insights_match = re.search(r'6\.\s*Additional Insights:(.*?)(?=\Z)', response, re.DOTALL)
-        if insights_match:
-            assessment["additional_insights"] = insights_match.group(1).strip()
-        
+        # Map section numbers to assessment fields and whether they hold a list
+        section_map = {
+            "1": ("specialist_impression", False),
+            "2": ("differential_considerations", True),
+            "3": ("esi_evaluation", False),
+            "4": ("specialized_recommendations", True),
+            "5": ("potential_pitfalls", False),
+            "6": ("additional_insights", False)
+        }
+
+        # Split the response on the numbered section headings in a single pass
+        # instead of running one regex scan per section
+        parts = SECTION_SPLIT_PATTERN.split(response)
+
+        for i in range(1, len(parts) - 1, 2):
+            field, is_list = section_map.get(parts[i], (None, False))
+            if not field:
+                continue
+            content = parts[i + 1].strip()
+            if is_list:
+                # Extract bullet or numbered items from the section
+                items = LIST_ITEM_PATTERN.findall(content)
+                assessment[field] = [item.strip() for item in items if item.strip()]
+            else:
+                assessment[field] = content
+
         # Extract ESI level from the esi_evaluation field
-        esi_digit_match = re.search(r'(\d+)', assessment["esi_evaluation"])
-        esi_level = esi_digit_match.group(1) if esi_digit_match else ""
+        # A character scan is all this needs - ESI levels are single digits
+        esi_level = next((c for c in assessment["esi_evaluation"] if c.isdigit()), "")
         
         # Create a summary for display in the discussion
         if esi_level:
@@ -177,6 +223,11 @@ class MedicalConsultantAgent:
     
     def _get_system_prompt(self):
         """Get the system prompt for the medical consultant agent"""
+        # Reuse the cached prompt instead of reloading and reformatting the
+        # ESI examples on every assessment
+        if MedicalConsultantAgent._system_prompt_cache is not None:
+            return MedicalConsultantAgent._system_prompt_cache
+
         # Load ESI examples - one per level
         esi_examples = load_esi_examples(num_per_level=1)
         
@@ -200,16 +251,12 @@ class MedicalConsultantAgent:
         
         Your assessment should provide sophisticated clinical analysis that integrates evidence-based medicine with practical emergency department considerations.
         
-        EMERGENCY SEVERITY INDEX (ESI) REFERENCE:
-        - ESI Level 1: Requires immediate life-saving intervention
-        - ESI Level 2: High-risk situation, severe pain/distress, or vital sign abnormalities
-        - ESI Level 3: Requires multiple resources but stable vital signs
-        - ESI Level 4: Requires one resource
-        - ESI Level 5: Requires no resources
+        {esi_reference}
         
         REFERENCE EXAMPLES:
         
         {examples}
         """
-        
-        return base_prompt.format(examples=examples_text) 
\ No newline at end of file
+
+        MedicalConsultantAgent._system_prompt_cache = base_prompt.format(esi_reference=ESI_REFERENCE_TEXT, examples=examples_text)
+        return MedicalConsultantAgent._system_prompt_cache
@@ -3,10 +3,50 @@ import json
 import os
 from utils.query_model import query_model
 from utils.esi_examples import load_esi_examples, format_examples_for_prompt
+from utils.esi_prompt import ESI_REFERENCE_TEXT
+from pydantic import TypeAdapter
 from utils.schema import TriageAssessment
 from utils.structured_parser import parse_structured_output
+from utils.agent_discussion import format_assessment_blocks
+
+# Precompiled patterns for _parse_assessment - compiled once at import
+# instead of on every response
+SECTION_SPLIT_PATTERN = re.compile(
+    r'([1-8])\.\s*(?:Initial Impression|Chief Complaint[^:\n]*|Concerning Findings|'
+    r'Estimated Resource Needs|Recommended ESI Level|Rationale|'
+    r'Immediate Nursing Interventions[^:\n]*|Additional Notes):'
+)
+LIST_ITEM_PATTERN = re.compile(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', re.DOTALL)
+JSON_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(\{.*\})\s*```', re.DOTALL)
+
+# Validator built once at import - validate_json parses and validates in
+# a single pass instead of rebuilding schema machinery per response
+_ASSESSMENT_ADAPTER = TypeAdapter(TriageAssessment)
+
+def _parse_json_response(response):
+    """Parse a JSON assessment response locally, or None if it is malformed"""
+    match = JSON_FENCE_PATTERN.search(response)
+    if match:
+        raw = match.group(1)
+    else:
+        # Take the outermost braces in case the model added prose around them
+        start, end = response.find('{'), response.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        raw = response[start:end + 1]
+
+    try:
+        # Validate against the schema so malformed output falls through to
+        # the extraction model instead of propagating bad data
+        return _ASSESSMENT_ADAPTER.validate_json(raw).model_dump()
+    except Exception:
+        return None
 
 class TriageNurseAgent:
+    # Cached system prompt shared by all instances - the ESI examples are
+    # selected with a fixed seed, so the prompt is identical across calls
+    _system_prompt_cache = None
+
     def __init__(self, model="gpt-4o-mini", api_key=None):
         """
         Initialize the Triage Nurse Agent
@@ -32,21 +72,29 @@ class TriageNurseAgent:
         # Create a system prompt for the triage nurse role
         system_prompt = self._get_system_prompt()
         
-        # Create the user prompt
+        # Create the user prompt - ask for JSON directly so the response can
+        # be parsed locally instead of via a second extraction LLM call. The
+        # static instructions come before the conversation so the prompt
+        # prefix stays identical across cases for provider-side caching.
         user_prompt = f"""
-        Please perform an initial triage assessment based on the following patient-nurse conversation:
-        
+        Please perform an initial triage assessment of the patient-nurse conversation below.
+
+        Respond with a single JSON object using exactly these keys:
+        {{
+            "initial_impression": "<initial impression>",
+            "chief_complaint": "<chief complaint as you understand it>",
+            "concerning_findings": "<concerning findings>",
+            "resource_needs": "<estimated resource needs>",
+            "recommended_esi": "<recommended ESI level>",
+            "rationale": "<rationale>",
+            "immediate_interventions": ["<at least 2-3 specific nursing actions>"],
+            "notes": "<additional notes>",
+            "summary": "<one-sentence summary including the ESI level>"
+        }}
+
+        The conversation is:
+
         {conversation_text}
-        
-        Provide your assessment in the following format:
-        1. Initial Impression:
-        2. Chief Complaint (as you understand it):
-        3. Concerning Findings:
-        4. Estimated Resource Needs:
-        5. Recommended ESI Level:
-        6. Rationale:
-        7. Immediate Nursing Interventions (list at least 2-3 specific actions):
-        8. Additional Notes:
         """
         
         # Query the model
@@ -54,21 +102,27 @@ class TriageNurseAgent:
             model_str=self.model,
             system_prompt=system_prompt,
             prompt=user_prompt,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            max_tokens=800
         )
         
-        # Parse the response
-        assessment = parse_structured_output(response, TriageAssessment)
-        
+        # Parse the JSON locally; only fall back to the extraction model if
+        # the response is malformed
+        assessment = _parse_json_response(response)
+        if assessment is None:
+            assessment = parse_structured_output(response, TriageAssessment)
+
         return assessment
     
-    def respond_to_assessments(self, conversation_text, assessments):
+    def respond_to_assessments(self, conversation_text, assessments, formatted_blocks=None):
         """
         Respond to other agents' assessments
         
         Args:
             conversation_text (str): The nurse-patient conversation
             assessments (dict): Assessments from all agents
+            formatted_blocks (dict, optional): Pre-formatted assessment
+                blocks keyed by role, as built by format_assessment_blocks
             
         Returns:
             str: Response to other assessments
@@ -86,18 +140,14 @@ class TriageNurseAgent:
         Be professional but direct in your assessment. Your primary concern is patient safety and appropriate triage.
         """
         
-        # Format the assessments for the prompt
-        formatted_assessments = []
-        for role, assessment in assessments.items():
-            if role != self.role:  # Don't include own assessment
-                formatted_assessments.append(f"{role} Assessment:")
-                if isinstance(assessment, dict):
-                    for key, value in assessment.items():
-                        formatted_assessments.append(f"- {key}: {value}")
-                else:
-                    formatted_assessments.append(f"- {assessment}")
-        
-        formatted_assessments_text = "\n".join(formatted_assessments)
+        # Format the assessments for the prompt, reusing blocks the
+        # discussion controller already built when available (own
+        # assessment excluded)
+        if formatted_blocks is None:
+            formatted_blocks = format_assessment_blocks(assessments)
+        formatted_assessments_text = "\n".join(
+            block for role, block in formatted_blocks.items() if role != self.role
+        )
         
         # Create the user prompt
         user_prompt = f"""
@@ -117,7 +167,8 @@ class TriageNurseAgent:
             model_str=self.model,
             system_prompt=system_prompt,
             prompt=user_prompt,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            max_tokens=500
         )
         
         return response
@@ -136,45 +187,37 @@ class TriageNurseAgent:
             "summary": ""  # Add a summary field
         }
         
-        # Extract sections using regex
-        impression_match = re.search(r'1\.\s*Initial Impression:(.*?)(?=2\.|\Z)', response, re.DOTALL)
-        if impression_match:
-            assessment["initial_impression"] = impression_match.group(1).strip()
-        
-        complaint_match = re.search(r'2\.\s*Chief Complaint.*?:(.*?)(?=3\.|\Z)', response, re.DOTALL)
-        if complaint_match:
-            assessment["chief_complaint"] = complaint_match.group(1).strip()
-        
-        findings_match = re.search(r'3\.\s*Concerning Findings:(.*?)(?=4\.|\Z)', response, re.DOTALL)
-        if findings_match:
-            assessment["concerning_findings"] = findings_match.group(1).strip()
-        
-        resources_match = re.search(r'4\.\s*Estimated Resource Needs:(.*?)(?=5\.|\Z)', response, re.DOTALL)
-        if resources_match:
-            assessment["resource_needs"] = resources_match.group(1).strip()
-        
-        esi_match = re.search(r'5\.\s*Recommended ESI Level:(.*?)(?=6\.|\Z)', response, re.DOTALL)
-        if esi_match:
-            assessment["recommended_esi"] = esi_match.group(1).strip()
-        
-        rationale_match = re.search(r'6\.\s*Rationale:(.*?)(?=7\.|\Z)', response, re.DOTALL)
-        if rationale_match:
-            assessment["rationale"] = rationale_match.group(1).strip()
-        
-        interventions_match = re.search(r'7\.\s*Immediate Nursing Interventions:(.*?)(?=8\.|\Z)', response, re.DOTALL)
-        if interventions_match:
-            interventions_text = interventions_match.group(1).strip()
-            # Extract interventions as a list
-            interventions_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', interventions_text, re.DOTALL)
-            assessment["immediate_interventions"] = [i.strip() for i in interventions_list if i.strip()]
-        
-        notes_match = re.search(r'8\.\s*Additional Notes:(.*?)(?=\Z)', response, re.DOTALL)
-        if notes_match:
-            assessment["notes"] = notes_match.group(1).strip()
-        
+        # Map section numbers to assessment fields and whether they hold a list
+        section_map = {
+            "1": ("initial_impression", False),
+            "2": ("chief_complaint", False),
+            "3": ("concerning_findings", False),
+            "4": ("resource_needs", False),
+            "5": ("recommended_esi", False),
+            "6": ("rationale", False),
+            "7": ("immediate_interventions", True),
+            "8": ("notes", False)
+        }
+
+        # Split the response on the numbered section headings in a single pass
+        # instead of running one regex scan per section
+        parts = SECTION_SPLIT_PATTERN.split(response)
+
+        for i in range(1, len(parts) - 1, 2):
+            field, is_list = section_map.get(parts[i], (None, False))
+            if not field:
+                continue
+            content = parts[i + 1].strip()
+            if is_list:
+                # Extract bullet or numbered items from the section
+                items = LIST_ITEM_PATTERN.findall(content)
+                assessment[field] = [item.strip() for item in items if item.strip()]
+            else:
+                assessment[field] = content
+
         # Extract ESI level from the recommended_esi field
-        esi_digit_match = re.search(r'(\d+)', assessment["recommended_esi"])
-        esi_level = esi_digit_match.group(1) if esi_digit_match else ""
+        # A character scan is all this needs - ESI levels are single digits
+        esi_level = next((c for c in assessment["recommended_esi"] if c.isdigit()), "")
         
         # Create a summary for display in the discussion
         assessment["summary"] = f"ESI Level: {esi_level}. Rationale: {assessment['rationale'][:100]}..."
@@ -183,6 +226,11 @@ class TriageNurseAgent:
     
     def _get_system_prompt(self):
         """Get the system prompt for the triage nurse agent"""
+        # Reuse the cached prompt instead of reloading and reformatting the
+        # ESI examples on every assessment
+        if TriageNurseAgent._system_prompt_cache is not None:
+            return TriageNurseAgent._system_prompt_cache
+
         # Load ESI examples - one per level
         esi_examples = load_esi_examples(num_per_level=1)
         
@@ -206,16 +254,12 @@ class TriageNurseAgent:
         
         Your assessment should be thorough and focused on objective clinical findings that impact ESI determination.
         
-        EMERGENCY SEVERITY INDEX (ESI) REFERENCE:
-        - ESI Level 1: Requires immediate life-saving intervention
-        - ESI Level 2: High-risk situation, severe pain/distress, or vital sign abnormalities
-        - ESI Level 3: Requires multiple resources but stable vital signs
-        - ESI Level 4: Requires one resource
-        - ESI Level 5: Requires no resources
+        {esi_reference}
         
         REFERENCE EXAMPLES:
         
         {examples}
         """
-        
-        return base_prompt.format(examples=examples_text) 
\ No newline at end of file
+
+        TriageNurseAgent._system_prompt_cache = base_prompt.format(esi_reference=ESI_REFERENCE_TEXT, examples=examples_text)
+        return TriageNurseAgent._system_prompt_cache
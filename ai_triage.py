@@ -1,8 +1,17 @@
 import os
 import argparse
+import glob
 import json
+import shutil
 from datetime import datetime
 
+# orjson serializes several times faster than stdlib json; fall back
+# silently when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Import using direct paths
 import sys
 sys.path.append('.')  # Add current directory to path
@@ -12,20 +21,49 @@ from agents.emergency_physician import EmergencyPhysicianAgent
 from agents.medical_consultant import MedicalConsultantAgent
 from utils.agent_discussion import AgentDiscussion
 from utils.schema import AgentAssessments, ESIResult, ClinicalData
+from utils.quick_reference import generate_quick_reference as build_quick_reference
+from utils.differential_diagnoses import generate_differential_diagnoses as build_differential_diagnoses
+
+import threading
+
+# Whole-case cache: conversations that normalize to the same text reuse the
+# prior deliberation instead of re-running all agents and the discussion.
+# Keyed on (model, lowercased whitespace-collapsed text) so trivial
+# reformatting still hits but a different model never serves another
+# model's result. Each entry holds (result, case_id that computed it).
+# Bounded FIFO - the keys are full patient transcripts, so the cache
+# must not grow without limit.
+_case_cache = {}
+_case_cache_lock = threading.Lock()
+_CASE_CACHE_MAX = 32
+
+# Deliberations currently in flight, keyed like the cache. Concurrent
+# requests for the same conversation wait on the first run's event instead
+# of spending a second full agent pipeline on an identical input.
+_inflight = {}
+
+def _normalize_conversation(conversation_text):
+    """Normalize conversation text for case-cache lookups"""
+    return " ".join(conversation_text.lower().split())
 
 class ClinicalTriageSystem:
-    def __init__(self, api_key=None, llm_backend="o1-mini", verbose=False):
+    def __init__(self, api_key=None, llm_backend="o1-mini", verbose=False, output_format="files"):
         """
         Initialize the Clinical Triage System
-        
+
         Args:
             api_key (str): API key for the LLM service
             llm_backend (str): LLM model to use
             verbose (bool): Whether to print verbose output
+            output_format (str): "files" writes per-case JSON and text
+                reports; "batch" appends each case to a single JSONL run
+                file for large evaluation runs
         """
         self.api_key = api_key
         self.llm_backend = llm_backend
         self.verbose = verbose
+        self.output_format = output_format
+        self._run_file = None
         
         # Set output directories
         self.output_dirs = {
@@ -51,6 +89,21 @@ class ClinicalTriageSystem:
         self.assessment_results = None
         self.case_id = None
     
+    def _copy_cached_discussion(self, source_case_id):
+        """Copy the source case's discussion report for a cache-hit case
+
+        Args:
+            source_case_id (str): Case whose deliberation produced the
+                cached result
+        """
+        if source_case_id == self.case_id:
+            return
+        prefix = f"{self.output_dirs['discussions']}/{source_case_id}"
+        for path in glob.glob(f"{prefix}_*.txt"):
+            target = f"{self.output_dirs['discussions']}/{self.case_id}{path[len(prefix):]}"
+            if not os.path.exists(target):
+                shutil.copyfile(path, target)
+
     def _generate_case_id(self):
         """Generate a unique case ID"""
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -77,12 +130,50 @@ class ClinicalTriageSystem:
             print(f"Processing case {self.case_id}...")
             print("Beginning agent discussion for ESI determination...")
         
-        # Conduct agent discussion to determine ESI level
-        discussion_result = self.discussion.deliberate(
-            conversation_text=conversation_text,
-            case_id=self.case_id
-        )
-        
+        # Reuse the prior deliberation for an equivalent conversation, or
+        # conduct the agent discussion to determine ESI level. If another
+        # thread is already deliberating the same conversation, wait for its
+        # result instead of starting a duplicate run.
+        cache_key = (self.llm_backend, _normalize_conversation(conversation_text))
+        while True:
+            with _case_cache_lock:
+                cached = _case_cache.get(cache_key)
+                if cached is not None:
+                    break
+                event = _inflight.get(cache_key)
+                if event is None:
+                    # This thread computes; others wait on the event
+                    event = threading.Event()
+                    _inflight[cache_key] = event
+                    break
+            event.wait()
+
+        if cached is None:
+            try:
+                discussion_result = self.discussion.deliberate(
+                    conversation_text=conversation_text,
+                    case_id=self.case_id
+                )
+                with _case_cache_lock:
+                    if len(_case_cache) >= _CASE_CACHE_MAX:
+                        # Evict the oldest entry (dicts preserve insertion order)
+                        _case_cache.pop(next(iter(_case_cache)))
+                    _case_cache[cache_key] = (discussion_result, self.case_id)
+            finally:
+                # Wake the waiters; on failure they retry the computation
+                with _case_cache_lock:
+                    _inflight.pop(cache_key, None)
+                event.set()
+        else:
+            discussion_result, source_case_id = cached
+            # The discussion report was written under the case that
+            # computed it; copy it so this case's consumers (e.g. the
+            # demo's discussion view) find a file of their own
+            self._copy_cached_discussion(source_case_id)
+            if self.verbose:
+                print(f"Reusing cached deliberation for case {self.case_id}")
+
+
         # Store and return results
         self.assessment_results = {
             "case_id": self.case_id,
@@ -94,8 +185,9 @@ class ClinicalTriageSystem:
             "discussion_summary": discussion_result["discussion_summary"]
         }
         
-        # Save the assessment results to a file
-        self.save_assessment_results()
+        # Save the assessment results to a file, reusing the timestamp
+        # captured above instead of taking a new one
+        self.save_assessment_results(timestamp=current_timestamp)
         
         # Generate quick reference for nurses
         self.generate_quick_reference()
@@ -105,31 +197,64 @@ class ClinicalTriageSystem:
         
         return self.assessment_results
     
-    def save_assessment_results(self):
-        """Save the assessment results to a file"""
+    def save_assessment_results(self, timestamp=None):
+        """
+        Save the assessment results to a file
+
+        Args:
+            timestamp (datetime, optional): Timestamp for the filenames;
+                defaults to now when called standalone
+        """
         # Create results directory if it doesn't exist
         os.makedirs(self.output_dirs["results"], exist_ok=True)
-        
+
         # Format the results for saving
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.output_dirs['results']}/{self.case_id}_{timestamp}.json"
-        
-        # Save as JSON
-        with open(filename, 'w') as f:
-            json.dump(self.assessment_results, f, indent=2)
-        
-        # Also save as human-readable text
-        text_filename = f"{self.output_dirs['results']}/{self.case_id}_{timestamp}.txt"
+        if timestamp is None:
+            timestamp = datetime.now()
+        stamp = timestamp.strftime("%Y%m%d_%H%M%S")
+
+        # Batch runs append one compact JSON line per case to a shared run
+        # file - far less I/O than two files per case, and the stream is
+        # easy to aggregate afterwards. The text report is then only
+        # written in verbose mode.
+        if self.output_format == "batch":
+            if self._run_file is None:
+                self._run_file = f"{self.output_dirs['results']}/run_{stamp}.jsonl"
+            if orjson is not None:
+                with open(self._run_file, 'ab') as f:
+                    f.write(orjson.dumps(self.assessment_results) + b"\n")
+            else:
+                with open(self._run_file, 'a') as f:
+                    f.write(json.dumps(self.assessment_results) + "\n")
+            if not self.verbose:
+                return self._run_file
+        else:
+            # Save as JSON
+            filename = f"{self.output_dirs['results']}/{self.case_id}_{stamp}.json"
+            if orjson is not None:
+                with open(filename, 'wb') as f:
+                    f.write(orjson.dumps(self.assessment_results, option=orjson.OPT_INDENT_2))
+            else:
+                with open(filename, 'w') as f:
+                    json.dump(self.assessment_results, f, indent=2)
+
+        # Also save as human-readable text - build the report in memory and
+        # write it with a single call instead of one write per line
+        lines = [
+            f"Case ID: {self.case_id}\n",
+            f"Timestamp: {stamp}\n\n",
+            f"ESI Level: {self.assessment_results['esi_level']}\n",
+            f"Confidence: {self.assessment_results['confidence']}%\n\n",
+            f"Justification:\n{self.assessment_results['justification']}\n\n",
+            "Recommended Actions:\n"
+        ]
+        for i, action in enumerate(self.assessment_results['recommended_actions'], 1):
+            lines.append(f"{i}. {action}\n")
+
+        text_filename = f"{self.output_dirs['results']}/{self.case_id}_{stamp}.txt"
         with open(text_filename, 'w') as f:
-            f.write(f"Case ID: {self.case_id}\n")
-            f.write(f"Timestamp: {timestamp}\n\n")
-            f.write(f"ESI Level: {self.assessment_results['esi_level']}\n")
-            f.write(f"Confidence: {self.assessment_results['confidence']}%\n\n")
-            f.write(f"Justification:\n{self.assessment_results['justification']}\n\n")
-            f.write("Recommended Actions:\n")
-            for i, action in enumerate(self.assessment_results['recommended_actions'], 1):
-                f.write(f"{i}. {action}\n")
-        
+            f.write("".join(lines))
+
         return text_filename
     
     def print_assessment(self):
@@ -162,15 +287,13 @@ class ClinicalTriageSystem:
 
     def generate_quick_reference(self):
         """Generate a quick reference file for nurses in action"""
-        from utils.quick_reference import generate_quick_reference
-        
         # Extract chief complaint if available
         chief_complaint = None
         if hasattr(self, 'nurse_assessment') and self.nurse_assessment:
             chief_complaint = self.nurse_assessment.get('chief_complaint')
-        
+
         # Generate the quick reference file
-        quick_ref_file = generate_quick_reference(
+        quick_ref_file = build_quick_reference(
             case_id=self.case_id,
             esi_level=self.assessment_results["esi_level"],
             confidence=self.assessment_results["confidence"],
@@ -183,10 +306,8 @@ class ClinicalTriageSystem:
 
     def generate_differential_diagnoses(self):
         """Generate potential differential diagnoses based on the assessment"""
-        from utils.differential_diagnoses import generate_differential_diagnoses
-        
         # Generate the differential diagnoses file
-        diff_dx_file = generate_differential_diagnoses(
+        diff_dx_file = build_differential_diagnoses(
             case_id=self.case_id,
             assessment_results=self.assessment_results,
             output_dir="differential_diagnoses"  # Create a new directory for these files
@@ -1,7 +1,6 @@
 import os
 import sys
 import json
-import time
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, send_file, Response
 from dotenv import load_dotenv
@@ -9,9 +8,18 @@ import werkzeug
 import flask
 import shutil
 import threading
+import itertools
 import re
+from concurrent.futures import ThreadPoolExecutor
 import pdb
 import sqlite3
+
+# orjson serializes large list responses several times faster than the
+# stdlib encoder jsonify uses; fall back silently when not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 sys.path.append(os.path.abspath(".."))
 from SpeechToText import RecordingManager
 from SpeechToText import assembly_request
@@ -37,27 +45,84 @@ import urllib.parse
 
 app = Flask(__name__, static_url_path='/static', static_folder='static')
 
-# Create output directories within the demo folder
+# Create output directories once at import - each makedirs costs a stat
+# syscall, so the per-request handlers assume these already exist
 os.makedirs("demo/quick_ref", exist_ok=True)
 os.makedirs("demo/results", exist_ok=True)
 os.makedirs("demo/discussions", exist_ok=True)
-
-# Store the latest results for display
-latest_results = {
-    "case_id": None,
-    "quick_ref_file": None,
-    "detailed_output_file": None,
-    "discussion_file": None,
-    "differential_diagnoses_file": None
-}
-
-# Store progress updates
-progress_updates = {
-    "current_task": "Initializing...",
-    "percentage": 0,
-    "status": "pending",
-    "message": ""
-}
+os.makedirs("demo/conversations", exist_ok=True)
+os.makedirs("demo/differential_diagnoses", exist_ok=True)
+os.makedirs("recordings", exist_ok=True)
+os.makedirs("transcriptions", exist_ok=True)
+
+# Per-case session state - concurrent /process requests each get their own
+# slot instead of clobbering shared globals. Endpoints accept an optional
+# case_id and fall back to the most recently started case, so the existing
+# single-case front end keeps working unchanged. Bounded FIFO like the
+# other caches: sessions pin the cached artifact text for their case, so
+# a long-running server must not keep one per case forever. Evicted
+# cases keep their files on disk; only the in-memory views go away.
+sessions = {}
+sessions_lock = threading.Lock()
+latest_case_id = None
+_case_counter = itertools.count(1)
+_MAX_SESSIONS = int(os.getenv('TRIAGE_MAX_SESSIONS', '32'))
+
+# Notified on every progress change so SSE streams can sleep until
+# something happens instead of polling
+progress_cond = threading.Condition()
+
+# Bounded worker pool for case processing - requests past the limit queue
+# instead of each spawning a thread, which also caps concurrent LLM calls
+EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv('TRIAGE_WORKERS', '4')))
+
+def _new_session(case_id):
+    """Create and register the session slot for a case"""
+    global latest_case_id
+    session = {
+        "progress": {
+            "current_task": "Initializing...",
+            "percentage": 0,
+            "status": "pending",
+            "message": ""
+        },
+        "results": {
+            "case_id": case_id,
+            "quick_ref_file": None,
+            "quick_ref_content": "",
+            "esi_level": None,
+            "detailed_output_file": None,
+            "detailed_content": None,
+            "discussion_file": None,
+            "discussion_content": None,
+            "differential_diagnoses_file": None,
+            "differential_content": None
+        }
+    }
+    with sessions_lock:
+        sessions[case_id] = session
+        latest_case_id = case_id
+        while len(sessions) > _MAX_SESSIONS:
+            # Evict the oldest case (dicts preserve insertion order)
+            sessions.pop(next(iter(sessions)))
+    return session
+
+def _get_session(case_id=None):
+    """Look up a session, defaulting to the most recently started case"""
+    with sessions_lock:
+        return sessions.get(case_id or latest_case_id)
+
+def _set_progress(session, **fields):
+    """Update a session's progress and wake any waiting SSE streams"""
+    with progress_cond:
+        session["progress"].update(fields)
+        progress_cond.notify_all()
+
+# Compiled once at module load - the quick-ref scan runs for every case,
+# and status polls reuse the cached match instead of re-scanning. The
+# pattern is bytes so the marker can be found in the raw file before any
+# UTF-8 decode happens.
+_ESI_LEVEL_PATTERN = re.compile(rb'ESI LEVEL: (\d)')
 
 # Add this right after the imports
 print(f"Flask version: {flask.__version__}")
@@ -66,22 +131,92 @@ print(f"Werkzeug version: {werkzeug.__version__}")
 # Add this after creating the Flask app
 recording_manager = RecordingManager()
 
+# Recordings always land in the same file - the directory is pre-created
+# at import, so the stop/transcribe handlers do no path work per request
+RECORDING_FILENAME = "recordings/audio.wav"
+
+# Single shared SQLite connection - opening and closing one per request
+# paid journal setup costs every time. WAL mode lets readers proceed while
+# a writer commits; the lock serializes access from request threads since
+# the connection is shared with check_same_thread=False.
+DB_PATH = 'demo/conversations.db'
+db_conn = None
+db_lock = threading.Lock()
+
+# Statement texts built once - sqlite3 keys its prepared-statement cache
+# on the exact SQL string, so reusing the same object makes every call
+# after the first a pure bind+step. The timestamp comes from SQLite's
+# strftime rather than a Python datetime.now() per insert.
+_INSERT_CONVERSATION_SQL = (
+    "INSERT INTO conversations (timestamp, conversation_text, esi_level, case_id, summary, conversation_file) "
+    "VALUES (strftime('%Y-%m-%dT%H:%M:%f', 'now'), ?, ?, ?, ?, ?)"
+)
+_SELECT_ALL_SQL = (
+    'SELECT id, timestamp, esi_level, case_id, summary FROM conversations '
+    'WHERE esi_level IS NOT NULL ORDER BY timestamp DESC'
+)
+_SELECT_BY_ID_SQL = 'SELECT * FROM conversations WHERE id = ?'
+_SELECT_BY_CASE_SQL = 'SELECT * FROM conversations WHERE case_id = ?'
+_SELECT_PRIORITIZED_SQL = (
+    "SELECT id, timestamp, esi_level, case_id, summary FROM conversations WHERE esi_level IS NOT NULL "
+    "ORDER BY CASE WHEN esi_level GLOB '[0-9]*' THEN CAST(esi_level AS INTEGER) ELSE 5 END ASC, "
+    "timestamp DESC"
+)
+
 # Set up SQLite database for conversation history
 def init_db():
-    conn = sqlite3.connect('demo/conversations.db')
-    cursor = conn.cursor()
-    cursor.execute('''
+    global db_conn
+    db_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    db_conn.row_factory = sqlite3.Row
+    db_conn.execute('PRAGMA journal_mode=WAL')
+    db_conn.execute('PRAGMA synchronous=NORMAL')
+    db_conn.execute('PRAGMA temp_store=MEMORY')
+    # Freed pages don't need zeroing - transcripts live on disk, not in
+    # the database, so there is nothing to securely erase
+    db_conn.execute('PRAGMA secure_delete=OFF')
+    db_conn.execute('''
     CREATE TABLE IF NOT EXISTS conversations (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT NOT NULL,
         conversation_text TEXT NOT NULL,
         esi_level TEXT,
         case_id TEXT,
-        summary TEXT
+        summary TEXT,
+        conversation_file TEXT
     )
     ''')
-    conn.commit()
-    conn.close()
+    # Existing databases predate the conversation_file column
+    try:
+        db_conn.execute('ALTER TABLE conversations ADD COLUMN conversation_file TEXT')
+    except sqlite3.OperationalError:
+        pass
+    # Indexes so list and prioritization queries read pre-sorted rows
+    # instead of scanning and sorting. The ESI index is partial on the
+    # same predicate the list/prioritize/bulk-delete statements use, so
+    # those plans traverse the index instead of checking every row.
+    # Databases holding the earlier non-partial definition are rebuilt
+    # once; everyone else keeps the idempotent CREATE below.
+    row = db_conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_conv_esi_ts'"
+    ).fetchone()
+    if row and row['sql'] and 'WHERE' not in row['sql'].upper():
+        db_conn.execute('DROP INDEX idx_conv_esi_ts')
+    db_conn.execute(
+        'CREATE INDEX IF NOT EXISTS idx_conv_esi_ts ON conversations(esi_level, timestamp DESC) '
+        'WHERE esi_level IS NOT NULL'
+    )
+    db_conn.execute('CREATE INDEX IF NOT EXISTS idx_conv_ts ON conversations(timestamp DESC)')
+    # Partial index: case_id lookups become an index seek without paying
+    # for rows that have no case_id. Plain, not UNIQUE - re-saving a case
+    # must stay an accepted insert, not an IntegrityError. Databases that
+    # picked up the short-lived unique variant are migrated once.
+    row = db_conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_conv_case_id'"
+    ).fetchone()
+    if row and row['sql'] and 'UNIQUE' in row['sql'].upper():
+        db_conn.execute('DROP INDEX idx_conv_case_id')
+    db_conn.execute('CREATE INDEX IF NOT EXISTS idx_conv_case_id ON conversations(case_id) WHERE case_id IS NOT NULL')
+    db_conn.commit()
 
 # Initialize the database
 init_db()
@@ -93,48 +228,67 @@ def save_conversation(conversation_text, esi_level=None, case_id=None, summary=N
     if not esi_level:
         return None
         
-    conn = sqlite3.connect('demo/conversations.db')
-    cursor = conn.cursor()
-    timestamp = datetime.now().isoformat()
-    
     # Ensure we have at least a basic summary if none is provided
     if not summary:
         summary = "Patient conversation (no summary available)"
-    
-    cursor.execute(
-        'INSERT INTO conversations (timestamp, conversation_text, esi_level, case_id, summary) VALUES (?, ?, ?, ?, ?)',
-        (timestamp, conversation_text, esi_level, case_id, summary)
-    )
-    conn.commit()
-    conn.close()
-    return cursor.lastrowid
+
+    # Store the transcript on disk and keep only the path in the table -
+    # full transcripts in a TEXT column spread rows over multiple B-tree
+    # pages and slow every query that touches the table
+    file_stem = case_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    conversation_file = f"demo/conversations/{file_stem}.txt"
+    with open(conversation_file, 'w') as f:
+        f.write(conversation_text)
+
+    # The connection context manager wraps the write in one transaction
+    # (single commit fsync) and rolls back on error
+    with db_lock, db_conn:
+        cursor = db_conn.execute(
+            _INSERT_CONVERSATION_SQL,
+            ("", esi_level, case_id, summary, conversation_file)
+        )
+        return cursor.lastrowid
 
 # Add this function to get all conversations
 def get_all_conversations():
     """Get all conversations from the database"""
-    conn = sqlite3.connect('demo/conversations.db')
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Only get conversations with ESI levels
-    cursor.execute('SELECT * FROM conversations WHERE esi_level IS NOT NULL ORDER BY timestamp DESC')
-    conversations = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return conversations
+    # Only get conversations with ESI levels. The full conversation_text
+    # blob is excluded - list views only need the metadata, and the text is
+    # fetchable via /get_conversation/<id>
+    with db_lock:
+        cursor = db_conn.execute(_SELECT_ALL_SQL)
+        return [dict(row) for row in cursor.fetchall()]
 
 # Fix the get_conversation function
 def get_conversation(conversation_id):
     """Get a specific conversation from the database"""
-    conn = sqlite3.connect('demo/conversations.db')
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM conversations WHERE id = ?', (conversation_id,))
-    
-    # Only call fetchone() once and store the result
-    result = cursor.fetchone()
-    conversation = dict(result) if result else None
-    
-    conn.close()
+    with db_lock:
+        cursor = db_conn.execute(_SELECT_BY_ID_SQL, (conversation_id,))
+
+        # Only call fetchone() once and store the result
+        result = cursor.fetchone()
+        return _hydrate_conversation(result)
+
+def get_conversation_by_case_id(case_id):
+    """Get a specific conversation by its case ID"""
+    # Index seek via idx_conv_case_id rather than a table scan
+    with db_lock:
+        cursor = db_conn.execute(_SELECT_BY_CASE_SQL, (case_id,))
+        result = cursor.fetchone()
+        return _hydrate_conversation(result)
+
+def _hydrate_conversation(row):
+    """Turn a conversations row into a dict, loading the transcript file
+
+    Rows saved before the on-disk transcript change carry the text in
+    the conversation_text column and pass through unchanged.
+    """
+    if row is None:
+        return None
+    conversation = dict(row)
+    conversation_file = conversation.pop('conversation_file', None)
+    if not conversation['conversation_text'] and conversation_file and os.path.exists(conversation_file):
+        conversation['conversation_text'] = _read_file_text(conversation_file)
     return conversation
 
 @app.route('/')
@@ -145,56 +299,126 @@ def index():
 @app.route('/progress')
 def progress():
     """Server-sent events for progress updates"""
+    session = _get_session(request.args.get('case_id'))
+
     def generate():
-        while progress_updates["status"] == "pending":
+        if session is None:
+            yield f"data: {json.dumps({'status': 'error', 'message': 'Unknown case'})}\n\n"
+            return
+
+        progress_state = session["progress"]
+        last_sent = None
+        while True:
+            # Sleep until _set_progress signals a change instead of waking
+            # twice a second to re-send identical events
+            with progress_cond:
+                if dict(progress_state) == last_sent and progress_state["status"] == "pending":
+                    progress_cond.wait(timeout=30)
+                snapshot = dict(progress_state)
+
+            if snapshot == last_sent:
+                # Keepalive comment so proxies don't drop the idle stream
+                yield ": ping\n\n"
+                continue
+            last_sent = snapshot
+
+            if snapshot["status"] != "pending":
+                # Send final update
+                data = json.dumps({
+                    "task": snapshot["current_task"],
+                    "percentage": 100,
+                    "message": snapshot["message"],
+                    "status": snapshot["status"]
+                })
+                yield f"data: {data}\n\n"
+                break
+
             data = json.dumps({
-                "task": progress_updates["current_task"],
-                "percentage": progress_updates["percentage"],
-                "message": progress_updates["message"]
+                "task": snapshot["current_task"],
+                "percentage": snapshot["percentage"],
+                "message": snapshot["message"]
             })
             yield f"data: {data}\n\n"
-            time.sleep(0.5)
-        
-        # Send final update
-        data = json.dumps({
-            "task": progress_updates["current_task"],
-            "percentage": 100,
-            "message": progress_updates["message"],
-            "status": progress_updates["status"]
-        })
-        yield f"data: {data}\n\n"
-    
+
     return Response(generate(), mimetype='text/event-stream')
 
-def process_case_task(patient_case, api_key, model="o1-mini"):
+def _json_response(payload):
+    """Serialize a JSON response with orjson when available
+
+    Dashboard list endpoints return hundreds of rows; orjson emits the
+    bytes directly instead of jsonify's str round-trip.
+    """
+    if orjson is not None:
+        return Response(orjson.dumps(payload), mimetype='application/json')
+    return jsonify(payload)
+
+def _read_file_text(path):
+    """Read a text file in one buffered pass
+
+    A 256 KiB buffer reads multi-MB discussion files in a handful of
+    syscalls instead of the default 8 KiB chunks.
+    """
+    with open(path, 'rb', buffering=262144) as f:
+        return f.read().decode()
+
+def _stage_file(src, dst):
+    """Stage an output file into the demo folder without copying bytes
+
+    A hardlink is a metadata-only operation on the same filesystem; fall
+    back to a regular copy when linking is not possible (cross-device,
+    unsupported filesystem).
+    """
+    try:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def _case_files(directory, case_id):
+    """List filenames in a directory that belong to the given case
+
+    os.scandir iterates the directory-entry cursor directly instead of
+    materializing the full listing before filtering.
+    """
+    return [entry.name for entry in os.scandir(directory) if entry.name.startswith(case_id)]
+
+def process_case_task(patient_case, api_key, model, case_id, session):
     """Background task to process the patient case"""
+    case_results = session["results"]
     try:
         # Reset progress
-        progress_updates["current_task"] = "Initializing triage system..."
-        progress_updates["percentage"] = 5
-        progress_updates["status"] = "pending"
-        progress_updates["message"] = f"Setting up the AI agents with {model}..."
-        
+        _set_progress(
+            session,
+            current_task="Initializing triage system...",
+            percentage=5,
+            status="pending",
+            message=f"Setting up the AI agents with {model}..."
+        )
+
         # Define a progress callback function
         def update_progress(message, percentage=None):
             if percentage is not None:
-                progress_updates["percentage"] = percentage
-            progress_updates["message"] = message
-        
+                _set_progress(session, message=message, percentage=percentage)
+            else:
+                _set_progress(session, message=message)
+
         # Initialize the triage system with the selected model
         triage_system = ClinicalTriageSystem(
             api_key=api_key,
             llm_backend=model,  # Use the selected model
             verbose=True
         )
-        
+        # Use the pre-allocated case id so output files match this session
+        triage_system.case_id = case_id
+
         # Monkey patch the AgentDiscussion.deliberate method to capture progress
         original_deliberate = triage_system.discussion.deliberate
-        
+
         def patched_deliberate(conversation_text, case_id=None):
             # Update the current task
-            progress_updates["current_task"] = "Agent Discussion"
-            
+            _set_progress(session, current_task="Agent Discussion")
+
             # Call the original method with our progress callback
             return original_deliberate(
                 conversation_text=conversation_text,
@@ -217,195 +441,219 @@ def process_case_task(patient_case, api_key, model="o1-mini"):
         )
         
         # Update progress for file operations
-        progress_updates["current_task"] = "Generating Output"
-        progress_updates["percentage"] = 90
-        progress_updates["message"] = "Creating output files..."
-        
-        case_id = results["case_id"]
-        latest_results["case_id"] = case_id
-        
-        # Create demo directories
-        os.makedirs("demo/quick_ref", exist_ok=True)
-        os.makedirs("demo/results", exist_ok=True)
-        os.makedirs("demo/discussions", exist_ok=True)
-        
-        # Copy quick reference files
+        _set_progress(
+            session,
+            current_task="Generating Output",
+            percentage=90,
+            message="Creating output files..."
+        )
+
+        # Collect (src, dst) pairs for all four artifact directories, then
+        # stage them in parallel - the copies are independent and I/O
+        # bound, so overlapping them collapses the staging step
+        stage_pairs = []
+
+        # Quick reference files
         quick_ref_dir = "quick_ref"
-        quick_ref_files = [f for f in os.listdir(quick_ref_dir) if f.startswith(case_id)]
+        quick_ref_files = _case_files(quick_ref_dir, case_id)
         for file in quick_ref_files:
             src = os.path.join(quick_ref_dir, file)
             dst = os.path.join("demo/quick_ref", file)
-            shutil.copy2(src, dst)
-            latest_results["quick_ref_file"] = dst
-        
-        # Copy result files
+            stage_pairs.append((src, dst))
+            case_results["quick_ref_file"] = dst
+
+        # Result files
         results_dir = "results"
-        result_files = [f for f in os.listdir(results_dir) if f.startswith(case_id)]
+        result_files = _case_files(results_dir, case_id)
         for file in result_files:
             src = os.path.join(results_dir, file)
             dst = os.path.join("demo/results", file)
-            shutil.copy2(src, dst)
+            stage_pairs.append((src, dst))
             if file.endswith(".txt"):
-                latest_results["detailed_output_file"] = dst
-        
-        # Copy discussion files
+                case_results["detailed_output_file"] = dst
+
+        # Discussion files
         discussions_dir = "discussions"
-        discussion_files = [f for f in os.listdir(discussions_dir) if f.startswith(case_id)]
+        discussion_files = _case_files(discussions_dir, case_id)
         for file in discussion_files:
             src = os.path.join(discussions_dir, file)
             dst = os.path.join("demo/discussions", file)
-            shutil.copy2(src, dst)
-            latest_results["discussion_file"] = dst
-        
-        # Copy differential diagnoses files
-        os.makedirs("demo/differential_diagnoses", exist_ok=True)
+            stage_pairs.append((src, dst))
+            case_results["discussion_file"] = dst
+
+        # Differential diagnoses file
         differential_diagnoses_file = triage_system.generate_differential_diagnoses()
         if differential_diagnoses_file and os.path.exists(differential_diagnoses_file):
             dst = os.path.join("demo/differential_diagnoses", os.path.basename(differential_diagnoses_file))
-            shutil.copy2(differential_diagnoses_file, dst)
-            latest_results["differential_diagnoses_file"] = dst
-        
+            stage_pairs.append((differential_diagnoses_file, dst))
+            case_results["differential_diagnoses_file"] = dst
+
+        # A short-lived local pool rather than EXECUTOR - staging runs
+        # inside an EXECUTOR worker, and waiting on tasks submitted to the
+        # same saturated pool could deadlock
+        if stage_pairs:
+            with ThreadPoolExecutor(max_workers=4) as stage_pool:
+                list(stage_pool.map(lambda pair: _stage_file(*pair), stage_pairs))
+
+        # Read and parse the quick reference once here so status polls can
+        # return the cached content instead of re-reading and re-matching
+        # the file on every request. The ESI marker is matched on the raw
+        # bytes; the single decode that follows is for the cached content.
+        if case_results["quick_ref_file"] and os.path.exists(case_results["quick_ref_file"]):
+            with open(case_results["quick_ref_file"], 'rb') as f:
+                data = f.read()
+            esi_match = _ESI_LEVEL_PATTERN.search(data)
+            if esi_match:
+                case_results["esi_level"] = esi_match.group(1).decode()
+            case_results["quick_ref_content"] = data.decode()
+
+        # Load the output files into the session now that they are final -
+        # the view endpoints then serve from memory instead of re-reading
+        # the same files on every request
+        for file_key, content_key in (
+            ("detailed_output_file", "detailed_content"),
+            ("discussion_file", "discussion_content"),
+            ("differential_diagnoses_file", "differential_content"),
+        ):
+            path = case_results[file_key]
+            if path and os.path.exists(path):
+                case_results[content_key] = _read_file_text(path)
+
         # Update progress
-        progress_updates["current_task"] = "Complete"
-        progress_updates["percentage"] = 100
-        progress_updates["message"] = f"Triage assessment complete! ESI Level: {results['esi_level']}"
-        progress_updates["status"] = "complete"
-        
+        _set_progress(
+            session,
+            current_task="Complete",
+            percentage=100,
+            message=f"Triage assessment complete! ESI Level: {results['esi_level']}",
+            status="complete"
+        )
+
     except Exception as e:
         # Update progress with error
-        progress_updates["current_task"] = "Error"
-        progress_updates["percentage"] = 100
-        progress_updates["message"] = str(e)
-        progress_updates["status"] = "error"
+        _set_progress(
+            session,
+            current_task="Error",
+            percentage=100,
+            message=str(e),
+            status="error"
+        )
 
 @app.route('/process', methods=['POST'])
 def process_case():
     """Process a patient case"""
-    # Reset progress updates
-    progress_updates["current_task"] = "Initializing..."
-    progress_updates["percentage"] = 0  # Reset to 0
-    progress_updates["status"] = "pending"
-    progress_updates["message"] = ""
-    
     # Get the patient case text from the form
     patient_case = request.form.get('conversation_text', '')
-    
+
     # Get the selected model
     selected_model = request.form.get('model', 'o1-mini')
-    
+
     if not patient_case:
         return jsonify({"error": "No patient case provided"}), 400
-    
+
     # Get API key from environment - use OpenAI API key
     api_key = os.getenv('OPENAI_API_KEY')
-    
+
     if not api_key:
         return jsonify({"error": "No OpenAI API key found in environment. Please set OPENAI_API_KEY in .env file."}), 400
-    
-    # Start processing in a background thread
-    thread = threading.Thread(target=process_case_task, args=(patient_case, api_key, selected_model))
-    thread.daemon = True
-    thread.start()
-    
-    # Return immediately with a success message
-    return jsonify({"success": True, "message": "Processing started"})
+
+    # Allocate this case's session slot up front so concurrent requests
+    # never share progress or result state. The counter suffix keeps ids
+    # unique even within the same second.
+    case_id = f"CASE-{datetime.now().strftime('%Y%m%d%H%M%S')}-{next(_case_counter)}"
+    session = _new_session(case_id)
+
+    # Submit to the shared pool - threads are reused across requests and
+    # excess submissions queue rather than oversubscribing
+    EXECUTOR.submit(process_case_task, patient_case, api_key, selected_model, case_id, session)
+
+    # Return immediately with the case id so the client can poll it
+    return jsonify({"success": True, "message": "Processing started", "case_id": case_id})
 
 @app.route('/check_status')
 def check_status():
     """Check the status of the processing"""
-    if progress_updates["status"] == "complete":
-        # Read the quick reference file for immediate display
-        quick_ref_content = ""
-        esi_level = None
-        if latest_results["quick_ref_file"] and os.path.exists(latest_results["quick_ref_file"]):
-            with open(latest_results["quick_ref_file"], 'r') as f:
-                quick_ref_content = f.read()
-                # Extract ESI level from the content
-                esi_match = re.search(r'ESI LEVEL: (\d)', quick_ref_content)
-                if esi_match:
-                    esi_level = esi_match.group(1)
-        
+    session = _get_session(request.args.get('case_id'))
+    if session is None:
+        return jsonify({
+            "status": "pending",
+            "task": "Initializing...",
+            "percentage": 0,
+            "message": ""
+        })
+
+    progress_state = session["progress"]
+    case_results = session["results"]
+
+    if progress_state["status"] == "complete":
+        # The quick reference was read and parsed once when the task
+        # finished - just return the cached content
         return jsonify({
             "status": "complete",
-            "case_id": latest_results["case_id"],
-            "quick_ref": quick_ref_content,
-            "esi_level": esi_level,
-            "has_detailed_output": latest_results["detailed_output_file"] is not None,
-            "has_discussion": latest_results["discussion_file"] is not None,
-            "has_differential_diagnoses": latest_results["differential_diagnoses_file"] is not None
+            "case_id": case_results["case_id"],
+            "quick_ref": case_results["quick_ref_content"],
+            "esi_level": case_results["esi_level"],
+            "has_detailed_output": case_results["detailed_output_file"] is not None,
+            "has_discussion": case_results["discussion_file"] is not None,
+            "has_differential_diagnoses": case_results["differential_diagnoses_file"] is not None
         })
-    elif progress_updates["status"] == "error":
+    elif progress_state["status"] == "error":
         return jsonify({
             "status": "error",
-            "message": progress_updates["message"]
+            "message": progress_state["message"]
         })
     else:
         return jsonify({
             "status": "pending",
-            "task": progress_updates["current_task"],
-            "percentage": progress_updates["percentage"],
-            "message": progress_updates["message"]
+            "task": progress_state["current_task"],
+            "percentage": progress_state["percentage"],
+            "message": progress_state["message"]
         })
 
 @app.route('/view_detailed_output')
 def view_detailed_output():
     """View the detailed output file"""
-    if not latest_results["detailed_output_file"] or not os.path.exists(latest_results["detailed_output_file"]):
+    session = _get_session(request.args.get('case_id'))
+    if session is None or session["results"]["detailed_content"] is None:
         return jsonify({"error": "No detailed output file available"}), 404
-    
-    with open(latest_results["detailed_output_file"], 'r') as f:
-        content = f.read()
-    
-    return jsonify({"content": content})
+
+    return jsonify({"content": session["results"]["detailed_content"]})
 
 @app.route('/view_discussion')
 def view_discussion():
     """View the discussion file"""
-    if not latest_results["discussion_file"] or not os.path.exists(latest_results["discussion_file"]):
+    session = _get_session(request.args.get('case_id'))
+    if session is None or session["results"]["discussion_content"] is None:
         return jsonify({"error": "No discussion file available"}), 404
-    
-    with open(latest_results["discussion_file"], 'r') as f:
-        content = f.read()
-    
-    return jsonify({"content": content})
+
+    return jsonify({"content": session["results"]["discussion_content"]})
 
 @app.route('/view_differential_diagnoses')
 def view_differential_diagnoses():
     """View the differential diagnoses file"""
-    if not latest_results["differential_diagnoses_file"] or not os.path.exists(latest_results["differential_diagnoses_file"]):
+    session = _get_session(request.args.get('case_id'))
+    if session is None or session["results"]["differential_content"] is None:
         return jsonify({"error": "No differential diagnoses file available"}), 404
-    
-    with open(latest_results["differential_diagnoses_file"], 'r') as f:
-        content = f.read()
-    
-    return jsonify({"content": content})
+
+    return jsonify({"content": session["results"]["differential_content"]})
 
 @app.route('/download/<file_type>')
 def download_file(file_type):
     """Download a file"""
-    if file_type == 'quick_ref' and latest_results["quick_ref_file"]:
-        return send_file(
-            latest_results["quick_ref_file"], 
-            as_attachment=True,
-            download_name=os.path.basename(latest_results["quick_ref_file"])
-        )
-    elif file_type == 'detailed_output' and latest_results["detailed_output_file"]:
-        return send_file(
-            latest_results["detailed_output_file"], 
-            as_attachment=True,
-            download_name=os.path.basename(latest_results["detailed_output_file"])
-        )
-    elif file_type == 'discussion' and latest_results["discussion_file"]:
-        return send_file(
-            latest_results["discussion_file"], 
-            as_attachment=True,
-            download_name=os.path.basename(latest_results["discussion_file"])
-        )
-    elif file_type == 'differential_diagnoses' and latest_results["differential_diagnoses_file"]:
+    session = _get_session(request.args.get('case_id'))
+    case_results = session["results"] if session else {}
+    file_key = f"{file_type}_file"
+    file_path = case_results.get(file_key)
+    if file_path:
+        # Passing the path (not an open file) lets Werkzeug use the WSGI
+        # file wrapper / sendfile, and conditional responses mean retries
+        # with If-Modified-Since or Range don't re-send the whole file
         return send_file(
-            latest_results["differential_diagnoses_file"], 
+            file_path,
             as_attachment=True,
-            download_name=os.path.basename(latest_results["differential_diagnoses_file"])
+            download_name=os.path.basename(file_path),
+            conditional=True,
+            etag=True,
+            max_age=0
         )
     else:
         return jsonify({"error": "File not found"}), 404
@@ -420,19 +668,12 @@ def start_recording():
 
 @app.route('/recorder/stop_recording', methods=['POST'])
 def stop_recording():
-    # Create recordings directory if it doesn't exist
-    os.makedirs('recordings', exist_ok=True)
-    
-    # Generate unique filename using timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"recordings/audio.wav"
-    
-    success = recording_manager.stop_recording(filename)
+    success = recording_manager.stop_recording(RECORDING_FILENAME)
     if success:
         return jsonify({
-            "status": "success", 
+            "status": "success",
             "message": "Recording stopped and saved",
-            "filename": filename
+            "filename": RECORDING_FILENAME
         }), 200
     else:
         return jsonify({
@@ -450,11 +691,7 @@ def recording_status():
 
 @app.route('/transcriber/transcribe', methods=['POST'])
 def transcribe_audio():
-    # Create transcriptions directory if it doesn't exist
-    os.makedirs('transcriptions', exist_ok=True)
-    
-    filename = f"recordings/audio.wav"
-    transcription = assembly_request.transcribe_audio(filename, "transcriptions/transcription.txt")
+    transcription = assembly_request.transcribe_audio(RECORDING_FILENAME, "transcriptions/transcription.txt")
     return jsonify({
         "status": "success",
         "transcription": transcription
@@ -481,7 +718,7 @@ def save_conversation_endpoint():
 def get_conversations_endpoint():
     """Get all conversations from the database"""
     conversations = get_all_conversations()
-    return jsonify({"conversations": conversations}), 200
+    return _json_response({"conversations": conversations}), 200
 
 # Add this endpoint to get a specific conversation
 @app.route('/get_conversation/<int:conversation_id>', methods=['GET'])
@@ -492,49 +729,62 @@ def get_conversation_endpoint(conversation_id):
         return jsonify({"error": "Conversation not found"}), 404
     return jsonify({"conversation": conversation}), 200
 
+# Add this endpoint to get a conversation by case ID
+@app.route('/get_conversation_by_case/<case_id>', methods=['GET'])
+def get_conversation_by_case_endpoint(case_id):
+    """Get a specific conversation by case ID"""
+    conversation = get_conversation_by_case_id(case_id)
+    if not conversation:
+        return jsonify({"error": "Conversation not found"}), 404
+    return jsonify({"conversation": conversation}), 200
+
+def _remove_conversation_files(paths):
+    """Delete the on-disk transcripts that belonged to removed rows
+
+    Transcripts live in files the rows merely point at, so deleting a
+    conversation must remove both or the patient text is orphaned on
+    disk.
+    """
+    for path in paths:
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
 # Add this endpoint to delete a conversation
 @app.route('/delete_conversation/<int:conversation_id>', methods=['DELETE'])
 def delete_conversation_endpoint(conversation_id):
     """Delete a conversation from the database"""
-    conn = sqlite3.connect('demo/conversations.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
-    conn.commit()
-    conn.close()
+    with db_lock, db_conn:
+        cursor = db_conn.execute('SELECT conversation_file FROM conversations WHERE id = ?', (conversation_id,))
+        files = [row['conversation_file'] for row in cursor.fetchall()]
+        db_conn.execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
+    _remove_conversation_files(files)
     return jsonify({"success": True, "message": "Conversation deleted"}), 200
 
 # Add this endpoint to delete all conversations
 @app.route('/delete_all_conversations', methods=['DELETE'])
 def delete_all_conversations_endpoint():
     """Delete all conversations from the database"""
-    conn = sqlite3.connect('demo/conversations.db')
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM conversations WHERE esi_level IS NOT NULL')
-    conn.commit()
-    conn.close()
+    with db_lock, db_conn:
+        cursor = db_conn.execute('SELECT conversation_file FROM conversations WHERE esi_level IS NOT NULL')
+        files = [row['conversation_file'] for row in cursor.fetchall()]
+        db_conn.execute('DELETE FROM conversations WHERE esi_level IS NOT NULL')
+    _remove_conversation_files(files)
     return jsonify({"success": True, "message": "All conversations deleted"}), 200
 
 # Add this endpoint to get prioritized patients
 @app.route('/get_prioritized_patients', methods=['GET'])
 def get_prioritized_patients_endpoint():
     """Get all conversations prioritized by ESI level"""
-    conn = sqlite3.connect('demo/conversations.db')
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Get all conversations with ESI levels
-    cursor.execute('SELECT * FROM conversations WHERE esi_level IS NOT NULL ORDER BY timestamp DESC')
-    conversations = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    # Sort by ESI level (1 is highest priority)
-    prioritized = sorted(conversations, key=lambda x: (
-        int(x['esi_level']) if x['esi_level'] and x['esi_level'].isdigit() else 5,
-        # Secondary sort by timestamp (most recent first)
-        x['timestamp']
-    ))
-    
-    return jsonify({"patients": prioritized}), 200
+    # Sort in SQL: ESI level first (1 is highest priority, non-numeric
+    # levels fall back to 5), then most recent first - no Python re-sort
+    with db_lock:
+        cursor = db_conn.execute(_SELECT_PRIORITIZED_SQL)
+        prioritized = [dict(row) for row in cursor.fetchall()]
+
+    return _json_response({"patients": prioritized}), 200
 
 if __name__ == '__main__':
     # Run the app
@@ -1,27 +1,159 @@
 import re
 import json
 import os
+import time
+import atexit
+import asyncio
+
+# orjson serializes the machine-readable discussion dump several times
+# faster than stdlib json; fall back silently when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from utils.query_model import query_model
+from utils.query_model import query_model, query_model_stream
 from utils.esi_examples import load_esi_examples, format_examples_for_prompt
-from utils.schema import ConsensusResult
+from utils.schema import ConsensusResult, BatchedAssessments
 from utils.structured_parser import parse_structured_output
+from pydantic import TypeAdapter
+
+# Cap on cached Round 1 assessments per discussion instance
+_ASSESSMENT_CACHE_MAX = 32
+
+# Validators and fence pattern for JSON responses parsed locally
+_BATCHED_ADAPTER = TypeAdapter(BatchedAssessments)
+_CONSENSUS_ADAPTER = TypeAdapter(ConsensusResult)
+_JSON_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(\{.*\})\s*```', re.DOTALL)
+
+# Precompiled patterns for _summarize_assessment and
+# _parse_consensus_result - compiled once at import instead of per call
+_DIGIT_PATTERN = re.compile(r'(\d+)')
+_ESI_LEVEL_PATTERN = re.compile(r'ESI\s*(?:level)?\s*(\d+)', re.IGNORECASE)
+_ESI_HEADER_PATTERN = re.compile(r'(?:ESI Level|Level|Final ESI Level):\s*(\d)', re.IGNORECASE)
+_ESI_ANY_DIGIT_PATTERN = re.compile(r'ESI.*?(\d)', re.IGNORECASE)
+_STANDALONE_DIGIT_PATTERN = re.compile(r'(?:^|\n|\s)(\d)(?:$|\n|\s)')
+_CONFIDENCE_PATTERN = re.compile(r'Confidence(?:\s*Level)?:\s*(\d+)%?', re.IGNORECASE)
+_JUSTIFICATION_PATTERN = re.compile(
+    r'(?:Justification|Clinical Justification|Rationale|Clinical Justification for ESI Level):(.*?)'
+    r'(?=Recommended(?:\s*Immediate)?\s*Actions|\Z)',
+    re.DOTALL | re.IGNORECASE
+)
+_ACTIONS_PATTERN = re.compile(r'Recommended(?:\s*Immediate)?\s*Actions:(.*?)(?=\Z|\n\s*\d+\.)', re.DOTALL | re.IGNORECASE)
+_BULLET_PATTERN = re.compile(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', re.DOTALL)
+
+# Keywords that suggest a severity level when no explicit ESI level is
+# found. All indicators are folded into one alternation so the fallback
+# scan is a single pass over the text instead of one substring search per
+# keyword; the most severe matched level wins.
+_SEVERITY_INDICATORS = {
+    "1": ["immediate", "life-saving", "critical", "unstable", "unresponsive", "cardiac arrest", "respiratory arrest"],
+    "2": ["high risk", "severe pain", "severe distress", "abnormal vital signs", "altered mental status"],
+    "3": ["multiple resources", "stable vital signs", "moderate symptoms"],
+    "4": ["one resource", "minor", "simple"],
+    "5": ["no resources", "minimal", "routine"]
+}
+_SEVERITY_KEYWORD_LEVELS = {
+    indicator: level
+    for level, indicators in _SEVERITY_INDICATORS.items()
+    for indicator in indicators
+}
+_SEVERITY_KEYWORD_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(indicator) for indicator in _SEVERITY_KEYWORD_LEVELS) + r')\b'
+)
+
+# Single background writer for discussion reports - the disk write comes
+# off deliberate's critical path, and one worker keeps writes ordered.
+# Shutdown at exit drains anything still queued.
+_WRITER = ThreadPoolExecutor(max_workers=1)
+atexit.register(_WRITER.shutdown)
+
+def _write_discussion_file(filename, parts):
+    """Write a discussion report; runs on the background writer thread"""
+    with open(filename, "w", buffering=1 << 16) as f:
+        f.writelines(parts)
+    print(f"Full discussion saved to {filename}")
+
+def _write_discussion_jsonl(filename, records):
+    """Write the machine-readable discussion dump as JSON lines
+
+    Runs on the background writer thread; downstream evaluation can
+    stream-parse the records instead of scraping the text report.
+    """
+    if orjson is not None:
+        with open(filename, "wb") as f:
+            f.writelines(orjson.dumps(record) + b"\n" for record in records)
+    else:
+        with open(filename, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+
+def _noop_progress(message, percentage=None):
+    """Do-nothing progress callback used when none is supplied"""
+    pass
+
+def format_assessment_blocks(assessments):
+    """
+    Format each agent's assessment into a reusable prompt block
+
+    Building the blocks once per round lets every agent reuse them in its
+    respond prompt instead of re-serializing the same assessments dict,
+    and keeps the formatted text byte-identical across the three prompts.
+
+    Args:
+        assessments (dict): Assessments keyed by agent role
+
+    Returns:
+        dict: Formatted text block per role
+    """
+    blocks = {}
+    for role, assessment in assessments.items():
+        lines = [f"{role} Assessment:"]
+        if isinstance(assessment, dict):
+            for key, value in assessment.items():
+                lines.append(f"- {key}: {value}")
+        else:
+            lines.append(f"- {assessment}")
+        blocks[role] = "\n".join(lines)
+    return blocks
 
 class AgentDiscussion:
-    def __init__(self, agents, model="o1-mini", api_key=None, max_rounds=3):
+    def __init__(self, agents, model="o1-mini", api_key=None, max_rounds=3, batch_initial_assessments=False):
         """
         Initialize the Agent Discussion framework
-        
+
         Args:
             agents (list): List of agent objects
             model (str): LLM model to use
             api_key (str): API key for the LLM service
             max_rounds (int): Maximum number of discussion rounds
+            batch_initial_assessments (bool): Produce all three Round 1
+                assessments with a single multi-role LLM call instead of
+                one call per agent (one round-trip, conversation tokenized
+                once); falls back to per-agent calls if the combined
+                response does not validate
         """
         self.agents = agents
         self.model = model
         self.api_key = api_key
         self.max_rounds = max_rounds
+        self.batch_initial_assessments = batch_initial_assessments
+
+        # One pool for both discussion rounds - threads are created once
+        # per system instead of per round per case
+        self._executor = ThreadPoolExecutor(max_workers=len(agents))
+
+        # Round 1 assessments keyed by (role, conversation text) - repeat
+        # runs of the same case (retries, evaluation sweeps, demo replays)
+        # skip the agent's LLM round-trip entirely. Bounded FIFO like the
+        # query_model response cache.
+        self._assessment_cache = {}
+
+        # Consensus system prompt is identical across cases - built lazily
+        # once, then reused so repeat deliberations skip the example file
+        # load and prompt formatting (a stable prefix also helps
+        # provider-side prompt caching)
+        self._consensus_system_prompt = None
         
         # ESI level descriptions for reference
         self.esi_descriptions = {
@@ -44,52 +176,130 @@ class AgentDiscussion:
         Returns:
             dict: Results of the deliberation
         """
+        # Substituting a no-op keeps the progress calls branchless below
+        report = progress_callback or _noop_progress
+
+        # Rounds 1 and 2: assessments and cross-responses
+        discussion_history = self._discussion_rounds(conversation_text, progress_callback)
+
+        # Round 3: Final deliberation and consensus
+        print("Round 3: Final deliberation and consensus...")
+        consensus_prompt = self._create_consensus_prompt(discussion_history, conversation_text)
+
+        # During discussion
+        report("Agents are discussing ESI determination...", 75)
+
+        # Stream the consensus so progress is visible from first token;
+        # the full buffer is still parsed once at the end. Fall back to
+        # the blocking call if streaming isn't available for the model.
+        try:
+            chunks = []
+            for chunk in query_model_stream(
+                model_str=self.model,
+                system_prompt=self._get_consensus_system_prompt(),
+                prompt=consensus_prompt,
+                openai_api_key=self.api_key
+            ):
+                chunks.append(chunk)
+                if len(chunks) % 40 == 0:
+                    report("Agents are drafting the consensus...", 80)
+            consensus_result = "".join(chunks)
+            if not consensus_result:
+                raise ValueError("empty streamed consensus")
+        except Exception:
+            consensus_result = query_model(
+                model_str=self.model,
+                system_prompt=self._get_consensus_system_prompt(),
+                prompt=consensus_prompt,
+                openai_api_key=self.api_key
+            )
+
+        # Parse the consensus JSON locally; only fall back to the
+        # extraction model if the response is malformed
+        final_result = self._parse_consensus_json(consensus_result)
+        if final_result is None:
+            final_result = parse_structured_output(consensus_result, ConsensusResult)
+
+        # Add discussion summary
+        final_result["discussion_summary"] = self._generate_discussion_summary(discussion_history)
+
+        # Save the full discussion to a file
+        self._save_discussion(discussion_history, case_id, final_result)
+
+        # After reaching consensus
+        report(f"Consensus reached: ESI Level {final_result['esi_level']} with {final_result['confidence']}% confidence", 85)
+
+        return final_result
+
+    def _discussion_rounds(self, conversation_text, progress_callback=None):
+        """
+        Run Rounds 1 and 2 and return the discussion history
+
+        Shared by deliberate and deliberate_batch, which differ only in
+        how the final consensus call is issued.
+
+        Args:
+            conversation_text (str): The text of the conversation
+            progress_callback (callable, optional): Callback function to report progress
+
+        Returns:
+            list: Discussion history entries with role and content
+        """
+        # Substituting a no-op keeps the progress calls branchless below
+        report = progress_callback or _noop_progress
+
         # Initialize discussion
         discussion_history = []
-        
-        # Initial assessments
-        if progress_callback:
-            progress_callback("Triage Nurse is analyzing the conversation...", 15)
-        
-        nurse_assessment = self.agents[0].assess_conversation(conversation_text)
-        
-        if progress_callback:
+
+        # Initial assessments - the three agents are independent at this
+        # stage, so their LLM calls run concurrently instead of serially
+        report("Triage Nurse, Emergency Physician and Medical Consultant are analyzing the conversation...", 15)
+
+        batched = None
+        if self.batch_initial_assessments:
+            batched = self._batched_initial_assessments(conversation_text)
+
+        if batched is not None:
+            nurse_assessment = batched["triage_nurse"]
+            physician_assessment = batched["emergency_physician"]
+            consultant_assessment = batched["medical_consultant"]
+            report("Initial assessments completed in a combined call", 65)
+        else:
+            futures = [
+                self._executor.submit(self._assess_cached, agent, conversation_text)
+                for agent in self.agents
+            ]
+            nurse_assessment = futures[0].result()
             # Get a summary from the assessment, safely handling different formats
             nurse_summary = nurse_assessment.get('summary', 'Assessment completed')
-            progress_callback(f"Triage Nurse: {nurse_summary[:100]}...", 25)
-        
-        if progress_callback:
-            progress_callback("Emergency Physician is evaluating the case...", 35)
-        
-        physician_assessment = self.agents[1].assess_conversation(conversation_text)
-        
-        if progress_callback:
+            report(f"Triage Nurse: {nurse_summary[:100]}...", 25)
+
+            physician_assessment = futures[1].result()
             # Get a summary from the assessment, safely handling different formats
             physician_summary = physician_assessment.get('summary', 'Assessment completed')
-            progress_callback(f"Emergency Physician: {physician_summary[:100]}...", 45)
-        
-        if progress_callback:
-            progress_callback("Medical Consultant is reviewing the case...", 55)
-        
-        consultant_assessment = self.agents[2].assess_conversation(conversation_text)
-        
-        if progress_callback:
+            report(f"Emergency Physician: {physician_summary[:100]}...", 45)
+
+            consultant_assessment = futures[2].result()
             # Get a summary from the assessment, safely handling different formats
             consultant_summary = consultant_assessment.get('summary', 'Assessment completed')
-            progress_callback(f"Medical Consultant: {consultant_summary[:100]}...", 65)
+            report(f"Medical Consultant: {consultant_summary[:100]}...", 65)
         
-        # Add to discussion history
+        # Add to discussion history - the three summaries share one
+        # severity-keyword scan instead of re-scanning per assessment
+        summaries = self._summarize_assessments_batched(
+            [nurse_assessment, physician_assessment, consultant_assessment]
+        )
         discussion_history.append({
             "role": "Triage Nurse",
-            "content": f"Initial assessment: {self._summarize_assessment(nurse_assessment)}"
+            "content": f"Initial assessment: {summaries[0]}"
         })
         discussion_history.append({
             "role": "Emergency Physician",
-            "content": f"Initial assessment: {self._summarize_assessment(physician_assessment)}"
+            "content": f"Initial assessment: {summaries[1]}"
         })
         discussion_history.append({
             "role": "Medical Consultant",
-            "content": f"Initial assessment: {self._summarize_assessment(consultant_assessment)}"
+            "content": f"Initial assessment: {summaries[2]}"
         })
         
         # Round 2: Agents respond to each other's assessments
@@ -102,46 +312,253 @@ class AgentDiscussion:
             self.agents[2].role: consultant_assessment
         }
         
-        for agent in self.agents:
+        # Format each assessment once; every agent reuses the blocks in its
+        # respond prompt
+        assessment_blocks = format_assessment_blocks(all_assessments)
+
+        # Each agent only reads the Round 1 assessments, so their response
+        # calls are independent and can overlap on the network instead of
+        # running back to back
+        response_futures = [
+            self._executor.submit(agent.respond_to_assessments, conversation_text,
+                                  all_assessments, assessment_blocks)
+            for agent in self.agents
+        ]
+
+        # Pipeline Round 3 preparation into Round 2's network wait: warm
+        # the consensus system prompt (example file load and formatting on
+        # first use) while the response calls are still in flight
+        self._get_consensus_system_prompt()
+
+        for agent, future in zip(self.agents, response_futures):
             print(f"  - {agent.role} is responding to other assessments...")
-            response = agent.respond_to_assessments(conversation_text, all_assessments)
-            
             # Add to discussion history
             discussion_history.append({
                 "role": agent.role,
-                "content": response
+                "content": future.result()
             })
-        
-        # Round 3: Final deliberation and consensus
-        print("Round 3: Final deliberation and consensus...")
-        consensus_prompt = self._create_consensus_prompt(discussion_history, conversation_text)
-        
-        consensus_result = query_model(
-            model_str=self.model,
-            system_prompt=self._get_consensus_system_prompt(),
-            prompt=consensus_prompt,
-            openai_api_key=self.api_key
+
+        return discussion_history
+
+    def deliberate_batch(self, cases, poll_interval=30):
+        """
+        Deliberate many cases with the consensus calls sent as one batch
+
+        Rounds 1 and 2 run per case as usual, but the final consensus
+        prompts are uploaded together to the OpenAI Batch API, which
+        processes them at half the per-token cost and without counting
+        against online rate limits - the right trade for offline
+        evaluation sweeps where latency doesn't matter.
+
+        Args:
+            cases (list): (case_id, conversation_text) pairs
+            poll_interval (int): Seconds between batch status polls
+
+        Returns:
+            dict: Final results keyed by case id
+        """
+        from openai import OpenAI
+
+        client = OpenAI(api_key=self.api_key or os.getenv("OPENAI_API_KEY"))
+        system_prompt = self._get_consensus_system_prompt()
+
+        # Rounds 1 and 2 for each case - a small local pool overlaps the
+        # cases; their agent calls share the instance executor
+        with ThreadPoolExecutor(max_workers=4) as case_pool:
+            round_futures = [
+                (case_id, conversation_text,
+                 case_pool.submit(self._discussion_rounds, conversation_text))
+                for case_id, conversation_text in cases
+            ]
+            histories = [
+                (case_id, conversation_text, future.result())
+                for case_id, conversation_text, future in round_futures
+            ]
+
+        # One request line per case, keyed by case id
+        os.makedirs("discussions", exist_ok=True)
+        batch_input_file = f"discussions/batch_input_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        with open(batch_input_file, "w") as f:
+            for case_id, conversation_text, discussion_history in histories:
+                consensus_prompt = self._create_consensus_prompt(discussion_history, conversation_text)
+                if self.model.startswith("o1"):
+                    messages = [{"role": "user", "content": f"{system_prompt}\n\n{consensus_prompt}"}]
+                else:
+                    messages = [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": consensus_prompt}
+                    ]
+                f.write(json.dumps({
+                    "custom_id": case_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {"model": self.model, "messages": messages}
+                }) + "\n")
+
+        # Upload and submit the batch, then poll until it settles
+        with open(batch_input_file, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
         )
-        
-        # Parse the consensus result
-        final_result = parse_structured_output(consensus_result, ConsensusResult)
-        
-        # Add discussion summary
-        final_result["discussion_summary"] = self._generate_discussion_summary(discussion_history)
-        
-        # Save the full discussion to a file
-        self._save_discussion(discussion_history, case_id, final_result)
-        
-        # During discussion
-        if progress_callback:
-            progress_callback("Agents are discussing ESI determination...", 75)
-        
-        # After reaching consensus
-        if progress_callback:
-            progress_callback(f"Consensus reached: ESI Level {final_result['esi_level']} with {final_result['confidence']}% confidence", 85)
-        
-        return final_result
-    
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = client.batches.retrieve(batch.id)
+
+        if batch.status != "completed":
+            raise Exception(f"Consensus batch finished with status {batch.status}")
+
+        # Map each response line back to its case and finish as usual
+        output_text = client.files.content(batch.output_file_id).text
+        responses = {}
+        for line in output_text.splitlines():
+            if not line:
+                continue
+            entry = json.loads(line)
+            responses[entry["custom_id"]] = entry["response"]["body"]["choices"][0]["message"]["content"]
+
+        results = {}
+        for case_id, conversation_text, discussion_history in histories:
+            consensus_result = responses.get(case_id)
+            if consensus_result is None:
+                continue
+            final_result = self._parse_consensus_json(consensus_result)
+            if final_result is None:
+                final_result = parse_structured_output(consensus_result, ConsensusResult)
+            final_result["discussion_summary"] = self._generate_discussion_summary(discussion_history)
+            self._save_discussion(discussion_history, case_id, final_result)
+            results[case_id] = final_result
+
+        return results
+
+    def _batched_initial_assessments(self, conversation_text):
+        """
+        Produce all three Round 1 assessments with one LLM call
+
+        The three initial assessments are independent and share the same
+        conversation text, so a single multi-role prompt replaces three
+        HTTP round-trips and tokenizes the conversation once.
+
+        Args:
+            conversation_text (str): The nurse-patient conversation
+
+        Returns:
+            dict: Assessment dicts keyed triage_nurse, emergency_physician
+                and medical_consultant, or None if the combined response
+                does not validate
+        """
+        system_prompt = """
+        You are an emergency department triage panel producing three independent assessments of the same patient-nurse conversation: one as an experienced triage nurse, one as an emergency physician, and one as a senior medical consultant.
+        Each assessment must reflect that role's perspective and recommend an Emergency Severity Index (ESI) level from 1 (most urgent) to 5 (least urgent).
+        """
+
+        user_prompt = f"""
+        Assess the patient-nurse conversation below from all three roles.
+
+        Respond with a single JSON object using exactly this structure:
+        {{
+            "triage_nurse": {{
+                "initial_impression": "<initial impression>",
+                "chief_complaint": "<chief complaint>",
+                "concerning_findings": "<concerning findings>",
+                "resource_needs": "<anticipated resource needs>",
+                "recommended_esi": "<recommended ESI level>",
+                "rationale": "<rationale>",
+                "immediate_interventions": ["<interventions>"],
+                "notes": "<notes>",
+                "summary": "<one-sentence summary including the ESI level>"
+            }},
+            "emergency_physician": {{
+                "clinical_assessment": "<clinical assessment>",
+                "potential_diagnoses": ["<potential diagnoses>"],
+                "esi_level": "<ESI level>",
+                "immediate_actions": ["<immediate actions>"],
+                "diagnostic_studies": ["<diagnostic studies>"],
+                "risk_assessment": "<risk assessment>",
+                "disposition": "<disposition>",
+                "summary": "<one-sentence summary including the ESI level>"
+            }},
+            "medical_consultant": {{
+                "specialist_impression": "<specialist impression>",
+                "differential_considerations": ["<differentials>"],
+                "esi_evaluation": "<ESI level evaluation>",
+                "specialized_recommendations": ["<specific actions>"],
+                "potential_pitfalls": "<potential pitfalls/concerns>",
+                "additional_insights": "<additional insights>",
+                "summary": "<one-sentence summary including the ESI level>"
+            }}
+        }}
+
+        The conversation is:
+
+        {conversation_text}
+        """
+
+        try:
+            response = query_model(
+                model_str=self.model,
+                system_prompt=system_prompt,
+                prompt=user_prompt,
+                openai_api_key=self.api_key,
+                max_tokens=2000
+            )
+        except Exception:
+            return None
+
+        match = _JSON_FENCE_PATTERN.search(response)
+        if match:
+            raw = match.group(1)
+        else:
+            # Take the outermost braces in case the model added prose
+            start, end = response.find('{'), response.rfind('}')
+            if start == -1 or end <= start:
+                return None
+            raw = response[start:end + 1]
+
+        try:
+            # Validate against the schema so a malformed combined response
+            # falls back to the per-agent calls
+            return _BATCHED_ADAPTER.validate_json(raw).model_dump()
+        except Exception:
+            return None
+
+    def _assess_cached(self, agent, conversation_text):
+        """Run an agent's initial assessment, reusing a cached result"""
+        key = (agent.role, conversation_text)
+        cached = self._assessment_cache.get(key)
+        if cached is not None:
+            return cached
+
+        assessment = agent.assess_conversation(conversation_text)
+        if len(self._assessment_cache) >= _ASSESSMENT_CACHE_MAX:
+            # Evict the oldest entry (dicts preserve insertion order)
+            self._assessment_cache.pop(next(iter(self._assessment_cache)))
+        self._assessment_cache[key] = assessment
+        return assessment
+
+    async def adeliberate(self, conversation_text, case_id=None, progress_callback=None):
+        """
+        Async variant of deliberate for event-loop callers
+
+        deliberate already overlaps the per-round agent calls on its own
+        executor, so the win here is not more concurrency but keeping the
+        caller's event loop free: async web handlers can await a case
+        without tying up a worker thread of their own.
+
+        Args:
+            conversation_text (str): The text of the conversation
+            case_id (str, optional): Case identifier
+            progress_callback (callable, optional): Callback function to report progress
+
+        Returns:
+            dict: Results of the deliberation
+        """
+        return await asyncio.to_thread(
+            self.deliberate, conversation_text, case_id, progress_callback
+        )
+
     def _save_discussion(self, discussion_history, case_id, final_result):
         """Save the full discussion to a file"""
         # Create discussions directory if it doesn't exist
@@ -151,60 +568,167 @@ class AgentDiscussion:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"discussions/{case_id}_{timestamp}.txt"
         
-        with open(filename, "w") as f:
-            f.write(f"CASE ID: {case_id}\n")
-            f.write(f"TIMESTAMP: {datetime.now().isoformat()}\n\n")
-            f.write("FULL AGENT DISCUSSION:\n")
-            f.write("="*80 + "\n\n")
-            
-            for entry in discussion_history:
-                f.write(f"[{entry['role']}]\n")
-                f.write(f"{entry['content']}\n\n")
-                f.write("-"*80 + "\n\n")
-            
-            f.write("="*80 + "\n\n")
-            f.write("FINAL CONSENSUS:\n")
-            f.write(f"ESI Level: {final_result['esi_level']}\n")
-            f.write(f"Confidence: {final_result['confidence']}%\n")
-            f.write(f"Justification: {final_result['justification']}\n\n")
-            f.write("Recommended Actions:\n")
-            for action in final_result['recommended_actions']:
-                f.write(f"- {action}\n")
-        
-        print(f"Full discussion saved to {filename}")
-        
+        # Build the report in memory and hand the whole list to writelines
+        # - one C-level loop instead of a Python write per entry, and no
+        # joined copy of the report
+        parts = [
+            f"CASE ID: {case_id}\n",
+            f"TIMESTAMP: {datetime.now().isoformat()}\n\n",
+            "FULL AGENT DISCUSSION:\n",
+            "="*80 + "\n\n"
+        ]
+
+        for entry in discussion_history:
+            parts.append(f"[{entry['role']}]\n")
+            parts.append(f"{entry['content']}\n\n")
+            parts.append("-"*80 + "\n\n")
+
+        parts.append("="*80 + "\n\n")
+        parts.append("FINAL CONSENSUS:\n")
+        parts.append(f"ESI Level: {final_result['esi_level']}\n")
+        parts.append(f"Confidence: {final_result['confidence']}%\n")
+        parts.append(f"Justification: {final_result['justification']}\n\n")
+        parts.append("Recommended Actions:\n")
+        for action in final_result['recommended_actions']:
+            parts.append(f"- {action}\n")
+
+        # Write the text report before returning: the demo stages
+        # case-prefixed files from discussions/ as soon as deliberate
+        # finishes, so the report must exist (and be complete) by then.
+        # Only the analytics JSONL dump goes to the background writer.
+        _write_discussion_file(filename, parts)
+
+        # Also dump a JSONL rendering alongside the text report - one
+        # record per discussion entry plus a trailing final-result record
+        # - so batch analytics parse structure instead of the text layout
+        records = [
+            {"case_id": case_id, "role": entry["role"], "content": entry["content"]}
+            for entry in discussion_history
+        ]
+        records.append({"case_id": case_id, "final": final_result})
+        _WRITER.submit(_write_discussion_jsonl, f"discussions/{case_id}_{timestamp}.jsonl", records)
+
         return filename
     
-    def _summarize_assessment(self, assessment):
+    def _severity_fallback_needed(self, assessment):
+        """Whether _summarize_assessment would reach the keyword scan
+
+        Mirrors the cheap extraction steps (summary fast path, explicit
+        ESI fields, the all-fields digit scan) so the batched caller can
+        tell in advance which assessments actually need the shared
+        severity scan.
+        """
+        summary = assessment.get('summary')
+        if summary and 'ESI Level' in summary:
+            return False
+
+        # Same first-truthy-field semantics as the elif chain in
+        # _summarize_assessment
+        for key in ('recommended_esi', 'esi_level', 'esi_evaluation'):
+            value = assessment.get(key)
+            if value:
+                if _DIGIT_PATTERN.search(value):
+                    return False
+                break
+
+        for value in assessment.values():
+            if isinstance(value, str) and ('ESI' in value or 'esi' in value.lower()):
+                if _DIGIT_PATTERN.search(value):
+                    return False
+
+        # No field yields a level without the keyword fallback (the
+        # rationale-based pattern can't match either - it would have
+        # required an ESI mention with a digit, caught above)
+        return True
+
+    def _summarize_assessments_batched(self, assessments):
+        """
+        Summarize several assessments with one shared severity scan
+
+        The keyword fallback in _summarize_assessment scans the full
+        assessment text; summarizing the Round 1 results together lets a
+        single finditer pass over the concatenated texts attribute hits
+        back to each assessment instead of scanning three times. Only
+        assessments that would actually reach the fallback join the
+        shared scan - in the common case (agents populate summary or an
+        explicit ESI field) no scan runs at all.
+
+        Args:
+            assessments (list): Assessment dicts in order
+
+        Returns:
+            list: Summary strings in the same order
+        """
+        fallback_indices = [
+            i for i, assessment in enumerate(assessments)
+            if self._severity_fallback_needed(assessment)
+        ]
+
+        levels = {}
+        if fallback_indices:
+            texts = [
+                " ".join([str(v) for v in assessments[i].values() if isinstance(v, (str, list))]).lower()
+                for i in fallback_indices
+            ]
+
+            # Concatenate with newline separators (which also break word
+            # boundaries between texts) and record each text's span
+            combined = "\n".join(texts)
+            boundaries = []
+            position = 0
+            for text in texts:
+                boundaries.append((position, position + len(text)))
+                position += len(text) + 1
+
+            # One pass; keep the most severe matched level per text
+            levels = {i: "" for i in fallback_indices}
+            for match in _SEVERITY_KEYWORD_PATTERN.finditer(combined):
+                level = _SEVERITY_KEYWORD_LEVELS[match.group(0)]
+                for j, (start, end) in enumerate(boundaries):
+                    if start <= match.start() < end:
+                        index = fallback_indices[j]
+                        if not levels[index] or level < levels[index]:
+                            levels[index] = level
+                        break
+
+        return [
+            self._summarize_assessment(assessment, fallback_level=levels.get(i))
+            for i, assessment in enumerate(assessments)
+        ]
+
+    def _summarize_assessment(self, assessment, fallback_level=None):
         """Create a summary of an agent's assessment"""
-        # If the assessment already has a summary, use it
-        if assessment.get('summary') and 'ESI Level' in assessment.get('summary'):
-            return assessment['summary']
+        # If the assessment already has a summary, use it - single lookup,
+        # and the common case returns before any pattern work below
+        summary = assessment.get('summary')
+        if summary and 'ESI Level' in summary:
+            return summary
         
         # Otherwise, try to create a summary based on available fields
         esi_level = ""
         
         # Try multiple ways to extract ESI level
         if assessment.get('recommended_esi'):
-            esi_match = re.search(r'(\d+)', assessment['recommended_esi'])
+            esi_match = _DIGIT_PATTERN.search(assessment['recommended_esi'])
             if esi_match:
                 esi_level = esi_match.group(1)
         elif assessment.get('esi_level'):
-            esi_match = re.search(r'(\d+)', assessment['esi_level'])
+            esi_match = _DIGIT_PATTERN.search(assessment['esi_level'])
             if esi_match:
                 esi_level = esi_match.group(1)
         elif assessment.get('esi_evaluation'):
-            esi_match = re.search(r'(\d+)', assessment['esi_evaluation'])
+            esi_match = _DIGIT_PATTERN.search(assessment['esi_evaluation'])
             if esi_match:
                 esi_level = esi_match.group(1)
         
         # If we still don't have an ESI level, search through all fields
         if not esi_level:
             for key, value in assessment.items():
-                if isinstance(value, str) and ('ESI' in value or 'esi' in value.lower()) and re.search(r'(\d+)', value):
-                    esi_match = re.search(r'(\d+)', value)
-                    esi_level = esi_match.group(1)
-                    break
+                if isinstance(value, str) and ('ESI' in value or 'esi' in value.lower()):
+                    esi_match = _DIGIT_PATTERN.search(value)
+                    if esi_match:
+                        esi_level = esi_match.group(1)
+                        break
         
         # Get a rationale or assessment
         rationale = ""
@@ -226,30 +750,29 @@ class AgentDiscussion:
         
         # If we still don't have an ESI level, try to extract it from the rationale
         if not esi_level and rationale:
-            esi_match = re.search(r'ESI\s*(?:level)?\s*(\d+)', rationale, re.IGNORECASE)
+            esi_match = _ESI_LEVEL_PATTERN.search(rationale)
             if esi_match:
                 esi_level = esi_match.group(1)
         
         # Create a default ESI level if we still don't have one
         if not esi_level:
-            # Look for keywords in the assessment that might indicate severity
-            severity_indicators = {
-                "1": ["immediate", "life-saving", "critical", "unstable", "unresponsive", "cardiac arrest", "respiratory arrest"],
-                "2": ["high risk", "severe pain", "severe distress", "abnormal vital signs", "altered mental status"],
-                "3": ["multiple resources", "stable vital signs", "moderate symptoms"],
-                "4": ["one resource", "minor", "simple"],
-                "5": ["no resources", "minimal", "routine"]
-            }
-            
-            # Convert assessment to a single string for keyword searching
-            assessment_text = " ".join([str(v) for v in assessment.values() if isinstance(v, (str, list))])
-            assessment_text = assessment_text.lower()
-            
-            # Check for severity indicators
-            for level, indicators in severity_indicators.items():
-                if any(indicator in assessment_text for indicator in indicators):
-                    esi_level = level
-                    break
+            if fallback_level is not None:
+                # A batched caller already ran the severity scan
+                esi_level = fallback_level
+            else:
+                # Scan each field lazily instead of joining every value
+                # into one big temporary string; keep the most severe
+                # matched level and stop early once a level 1 keyword is
+                # seen, since nothing can outrank it
+                for value in assessment.values():
+                    if not isinstance(value, (str, list)):
+                        continue
+                    for keyword in _SEVERITY_KEYWORD_PATTERN.findall(str(value).lower()):
+                        level = _SEVERITY_KEYWORD_LEVELS[keyword]
+                        if not esi_level or level < esi_level:
+                            esi_level = level
+                    if esi_level == "1":
+                        break
         
         if esi_level and rationale:
             return f"ESI Level: {esi_level}. Rationale: {rationale}..."
@@ -290,13 +813,18 @@ class AgentDiscussion:
     
     def _get_consensus_system_prompt(self):
         """Get the system prompt for the consensus model"""
+        # Reuse the cached prompt instead of reloading and reformatting
+        # the ESI examples on every deliberation
+        if self._consensus_system_prompt is not None:
+            return self._consensus_system_prompt
+
         # Load ESI examples - one per level
         esi_examples = load_esi_examples(num_per_level=1)
-        
+
         # Format examples for consensus
         examples_text = format_examples_for_prompt(esi_examples, agent_type="consensus")
-        
-        return f"""
+
+        self._consensus_system_prompt = f"""
         You are an expert emergency medicine triage system that integrates the assessments of multiple medical professionals.
         Your task is to determine the final Emergency Severity Index (ESI) level for a patient based on the discussion among a triage nurse, emergency physician, and medical consultant.
         
@@ -318,24 +846,48 @@ class AgentDiscussion:
         
         {examples_text}
         
-        Your output must follow this exact format:
-        
-        ESI Level: [1-5]
-        Confidence: [0-100]%
-        Clinical Justification: [Detailed explanation of why this ESI level is appropriate]
-        Recommended Immediate Actions: [List of specific actions that should be taken]
+        Respond with a single JSON object using exactly these keys:
+
+        {{
+            "esi_level": "<1-5>",
+            "confidence": <0-100>,
+            "clinical_justification": "<detailed explanation of why this ESI level is appropriate>",
+            "recommended_actions": ["<specific actions that should be taken>"]
+        }}
         """
-    
+        return self._consensus_system_prompt
+
+    def _parse_consensus_json(self, response):
+        """Parse a JSON consensus response locally, or None if malformed
+
+        validate_json parses and validates in a single pass through the
+        adapter built once at import; the schema itself mirrors whichever
+        justification key the model answered with.
+        """
+        match = _JSON_FENCE_PATTERN.search(response)
+        if match:
+            raw = match.group(1)
+        else:
+            start, end = response.find('{'), response.rfind('}')
+            if start == -1 or end <= start:
+                return None
+            raw = response[start:end + 1]
+
+        try:
+            return _CONSENSUS_ADAPTER.validate_json(raw).model_dump()
+        except Exception:
+            return None
+
     def _parse_consensus_result(self, result):
         """Parse the consensus result into a structured format"""
         # Extract ESI level - try multiple patterns
-        esi_match = re.search(r'(?:ESI Level|Level|Final ESI Level):\s*(\d)', result, re.IGNORECASE)
+        esi_match = _ESI_HEADER_PATTERN.search(result)
         if not esi_match:
             # Try to find any digit after ESI or Level
-            esi_match = re.search(r'ESI.*?(\d)', result, re.IGNORECASE)
+            esi_match = _ESI_ANY_DIGIT_PATTERN.search(result)
         if not esi_match:
             # Try to find any standalone digit that might be the ESI level
-            esi_match = re.search(r'(?:^|\n|\s)(\d)(?:$|\n|\s)', result)
+            esi_match = _STANDALONE_DIGIT_PATTERN.search(result)
         
         # If we found a match, use it; otherwise default to level 3 (middle ground)
         esi_level = esi_match.group(1) if esi_match else "3"
@@ -346,26 +898,26 @@ class AgentDiscussion:
             esi_level = "3"
         
         # Extract confidence
-        confidence_match = re.search(r'Confidence(?:\s*Level)?:\s*(\d+)%?', result, re.IGNORECASE)
+        confidence_match = _CONFIDENCE_PATTERN.search(result)
         confidence = int(confidence_match.group(1)) if confidence_match else 80
         
         # Extract justification
-        justification_match = re.search(r'(?:Justification|Clinical Justification|Rationale|Clinical Justification for ESI Level):(.*?)(?=Recommended(?:\s*Immediate)?\s*Actions|\Z)', result, re.DOTALL | re.IGNORECASE)
+        justification_match = _JUSTIFICATION_PATTERN.search(result)
         justification = justification_match.group(1).strip() if justification_match else "No justification provided."
         
         # Extract recommended actions
         actions = []
-        actions_match = re.search(r'Recommended(?:\s*Immediate)?\s*Actions:(.*?)(?=\Z|\n\s*\d+\.)', result, re.DOTALL | re.IGNORECASE)
+        actions_match = _ACTIONS_PATTERN.search(result)
         if actions_match:
             actions_text = actions_match.group(1).strip()
             # Extract actions as a list - look for bullet points or numbered items
-            actions_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', actions_text, re.DOTALL)
+            actions_list = _BULLET_PATTERN.findall(actions_text)
             actions = [a.strip() for a in actions_list if a.strip() and not a.startswith("**")]
         
         # If no actions found or actions contain meta-instructions, try a different approach
         if not actions or any("**" in action for action in actions):
             # Look for any bullet points or numbered items in the entire text
-            actions_list = re.findall(r'(?:^|\n)\s*(?:-|\d+\.)\s*(.*?)(?=\n\s*(?:-|\d+\.)|\Z)', result, re.DOTALL)
+            actions_list = _BULLET_PATTERN.findall(result)
             # Filter out meta-instructions and keep only reasonable-length action items
             actions = [a.strip() for a in actions_list if a.strip() 
                       and not a.startswith("**") 
@@ -450,9 +1002,12 @@ class AgentDiscussion:
         summary = []
         
         for entry in discussion_history:
-            # Extract the first sentence or up to 100 characters
+            # Extract the first sentence or up to 100 characters - find the
+            # first period instead of splitting the whole transcript into a
+            # list just to read its first element
             content = entry["content"]
-            first_sentence = content.split('.')[0] + '.'
+            idx = content.find('.')
+            first_sentence = content[:idx + 1] if idx != -1 else content + '.'
             if len(first_sentence) > 100:
                 first_sentence = first_sentence[:97] + '...'
             
@@ -3,19 +3,54 @@ import json
 from datetime import datetime
 
 class ConversationParser:
+    # Pre-compiled extraction patterns - each group is a single alternation
+    # so one scan of the text replaces one scan per phrase variant
+    CHIEF_COMPLAINT_PATTERN = re.compile(
+        r'(?:chief complaint|cc|presenting with|here for|presenting for|reason for visit'
+        r'|complains of|complaining of|patient states|pt states)[:\s]*([^.]+)',
+        re.IGNORECASE
+    )
+
+    MEDICAL_HISTORY_PATTERN = re.compile(
+        r'(?:medical history|pmh|past medical history|history of|hx of'
+        r'|diagnosed with|dx with)[:\s]*([^.]+)',
+        re.IGNORECASE
+    )
+
+    ALLERGY_PATTERN = re.compile(
+        r'(?:allergies|allergic to|allergy|allergic)[:\s]*([^.]+)',
+        re.IGNORECASE
+    )
+
+    MEDICATION_PATTERN = re.compile(
+        r'(?:medications|meds|taking|prescribed|prescription)[:\s]*([^.]+)',
+        re.IGNORECASE
+    )
+
+    # Sentence walker for the chief-complaint fallback - yields sentences
+    # lazily so only the first few are ever materialized
+    SENTENCE_PATTERN = re.compile(r'[^.]+')
+
+    # Group 1 captures only the male terms, so each match classifies itself
+    GENDER_PATTERN = re.compile(
+        r'\b(?:(male|man|boy|gentleman|he|him|his)'
+        r'|female|woman|girl|lady|she|her|hers)\b',
+        re.IGNORECASE
+    )
+
     def __init__(self):
         """Initialize the conversation parser"""
         # Regular expressions for extracting clinical data
         self.regex_patterns = {
-            "age": r'(\d+)[\s-]*(?:year|yr)s?[\s-]*old',
-            "temperature": r'(?:temp|temperature)[:\s]*(\d+\.?\d*)',
-            "heart_rate": r'(?:hr|heart rate|pulse)[:\s]*(\d+)',
-            "respiratory_rate": r'(?:rr|resp|respiratory rate)[:\s]*(\d+)',
-            "blood_pressure": r'(?:bp|blood pressure)[:\s]*(\d+)[/](\d+)',
-            "oxygen_saturation": r'(?:o2|oxygen|sat|saturation)[:\s]*(\d+)',
-            "pain_level": r'pain[^.]*?(\d+)(?:/10)?',
+            "age": re.compile(r'(\d+)[\s-]*(?:year|yr)s?[\s-]*old', re.IGNORECASE),
+            "temperature": re.compile(r'(?:temp|temperature)[:\s]*(\d+\.?\d*)', re.IGNORECASE),
+            "heart_rate": re.compile(r'(?:hr|heart rate|pulse)[:\s]*(\d+)', re.IGNORECASE),
+            "respiratory_rate": re.compile(r'(?:rr|resp|respiratory rate)[:\s]*(\d+)', re.IGNORECASE),
+            "blood_pressure": re.compile(r'(?:bp|blood pressure)[:\s]*(\d+)[/](\d+)', re.IGNORECASE),
+            "oxygen_saturation": re.compile(r'(?:o2|oxygen|sat|saturation)[:\s]*(\d+)', re.IGNORECASE),
+            "pain_level": re.compile(r'pain[^.]*?(\d+)(?:/10)?', re.IGNORECASE),
         }
-        
+
         # Keywords for symptom categorization
         self.symptom_categories = {
             "respiratory": ["cough", "shortness of breath", "sob", "dyspnea", "wheezing"],
@@ -25,6 +60,21 @@ class ConversationParser:
             "musculoskeletal": ["joint pain", "back pain", "fracture", "sprain", "injury"],
             "general": ["fever", "fatigue", "weakness", "malaise"]
         }
+
+        # Single combined pattern over every symptom keyword: one linear
+        # scan of the text replaces a substring check plus regex pass per
+        # keyword. Longest keywords first so multi-word symptoms win over
+        # any shorter alternative at the same position.
+        self._symptom_to_category = {
+            symptom: category
+            for category, symptom_list in self.symptom_categories.items()
+            for symptom in symptom_list
+        }
+        self._symptom_pattern = re.compile(
+            '|'.join(sorted(map(re.escape, self._symptom_to_category),
+                            key=len, reverse=True)),
+            re.IGNORECASE
+        )
     
     def extract_clinical_data(self, conversation_text):
         """
@@ -36,9 +86,11 @@ class ConversationParser:
         Returns:
             dict: Extracted clinical data
         """
-        # Convert to lowercase for easier matching
-        text = conversation_text.lower()
-        
+        # All patterns are compiled with re.IGNORECASE, so the text can be
+        # matched as-is without allocating a lowercase copy of the whole
+        # conversation
+        text = conversation_text
+
         # Initialize the data structure
         clinical_data = {
             "chief_complaint": self._extract_chief_complaint(text),
@@ -57,25 +109,23 @@ class ConversationParser:
     def _extract_chief_complaint(self, text):
         """Extract the chief complaint from the conversation"""
         # Look for common phrases that introduce chief complaints
-        patterns = [
-            r'(?:chief complaint|cc|presenting with|here for|presenting for|reason for visit)[:\s]*([^.]+)',
-            r'(?:complains of|complaining of)[:\s]*([^.]+)',
-            r'(?:patient states|pt states)[:\s]*([^.]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        match = self.CHIEF_COMPLAINT_PATTERN.search(text)
+        if match:
+            return match.group(1).strip()
+        
+        # If no match found, try to extract the first symptom mentioned.
+        # Walk the sentences lazily instead of splitting the whole
+        # conversation when only the first three are inspected.
+        for index, sentence_match in enumerate(self.SENTENCE_PATTERN.finditer(text)):
+            if index >= 3:  # Check first 3 sentences
+                break
+            sentence = sentence_match.group(0)
+            match = self._symptom_pattern.search(sentence)
             if match:
-                return match.group(1).strip()
-        
-        # If no match found, try to extract the first symptom mentioned
-        sentences = text.split('.')
-        for sentence in sentences[:3]:  # Check first 3 sentences
-            for symptom_list in self.symptom_categories.values():
-                for symptom in symptom_list:
-                    if symptom in sentence:
-                        return f"{symptom} {sentence.split(symptom)[1].strip()}"
-        
+                # Keep the keyword lowercase as before; only the matched
+                # word is copied, not the conversation
+                return f"{match.group(0).lower()} {sentence[match.end():].strip()}"
+
         return "Unknown"
     
     def _extract_vital_signs(self, text):
@@ -83,33 +133,33 @@ class ConversationParser:
         vital_signs = {}
         
         # Extract temperature
-        temp_match = re.search(self.regex_patterns["temperature"], text)
+        temp_match = self.regex_patterns["temperature"].search(text)
         if temp_match:
             vital_signs["temperature"] = float(temp_match.group(1))
         
         # Extract heart rate
-        hr_match = re.search(self.regex_patterns["heart_rate"], text)
+        hr_match = self.regex_patterns["heart_rate"].search(text)
         if hr_match:
             vital_signs["heart_rate"] = int(hr_match.group(1))
         
         # Extract respiratory rate
-        rr_match = re.search(self.regex_patterns["respiratory_rate"], text)
+        rr_match = self.regex_patterns["respiratory_rate"].search(text)
         if rr_match:
             vital_signs["respiratory_rate"] = int(rr_match.group(1))
         
         # Extract blood pressure
-        bp_match = re.search(self.regex_patterns["blood_pressure"], text)
+        bp_match = self.regex_patterns["blood_pressure"].search(text)
         if bp_match:
             vital_signs["blood_pressure_systolic"] = int(bp_match.group(1))
             vital_signs["blood_pressure_diastolic"] = int(bp_match.group(2))
         
         # Extract oxygen saturation
-        o2_match = re.search(self.regex_patterns["oxygen_saturation"], text)
+        o2_match = self.regex_patterns["oxygen_saturation"].search(text)
         if o2_match:
             vital_signs["oxygen_saturation"] = int(o2_match.group(1))
         
         # Extract pain level
-        pain_match = re.search(self.regex_patterns["pain_level"], text)
+        pain_match = self.regex_patterns["pain_level"].search(text)
         if pain_match:
             vital_signs["pain_level"] = int(pain_match.group(1))
         
@@ -118,17 +168,21 @@ class ConversationParser:
     def _extract_symptoms(self, text):
         """Extract symptoms from the conversation"""
         symptoms = []
-        
-        # Check for symptoms in each category
-        for category, symptom_list in self.symptom_categories.items():
-            for symptom in symptom_list:
-                if symptom in text:
-                    # Try to get context around the symptom
-                    pattern = f"[^.]*{symptom}[^.]*"
-                    matches = re.findall(pattern, text)
-                    for match in matches:
-                        symptoms.append(match.strip())
-        
+        seen = set()
+
+        # One pass over the text finds every symptom keyword; the
+        # containing sentence is recovered by slicing between the
+        # surrounding sentence boundaries
+        for match in self._symptom_pattern.finditer(text):
+            start = text.rfind('.', 0, match.start()) + 1
+            end = text.find('.', match.end())
+            if end == -1:
+                end = len(text)
+            sentence = text[start:end].strip()
+            if sentence and sentence not in seen:
+                seen.add(sentence)
+                symptoms.append(sentence)
+
         return symptoms
     
     def _extract_medical_history(self, text):
@@ -136,37 +190,32 @@ class ConversationParser:
         history = []
         
         # Look for common phrases that introduce medical history
-        patterns = [
-            r'(?:medical history|pmh|past medical history)[:\s]*([^.]+)',
-            r'(?:history of|hx of)[:\s]*([^.]+)',
-            r'(?:diagnosed with|dx with)[:\s]*([^.]+)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                history.append(match.strip())
+        for match in self.MEDICAL_HISTORY_PATTERN.finditer(text):
+            history.append(match.group(1).strip())
         
         return history
     
     def _extract_age(self, text):
         """Extract patient age from the conversation"""
-        age_match = re.search(self.regex_patterns["age"], text)
+        age_match = self.regex_patterns["age"].search(text)
         if age_match:
             return int(age_match.group(1))
         return None
     
     def _extract_gender(self, text):
         """Extract patient gender from the conversation"""
-        male_pattern = r'\b(?:male|man|boy|gentleman|he|him|his)\b'
-        female_pattern = r'\b(?:female|woman|girl|lady|she|her|hers)\b'
-        
-        male_matches = re.findall(male_pattern, text)
-        female_matches = re.findall(female_pattern, text)
-        
-        if len(male_matches) > len(female_matches):
+        # One scan tallies both genders; group 1 is set only for male terms
+        male_count = 0
+        female_count = 0
+        for match in self.GENDER_PATTERN.finditer(text):
+            if match.group(1) is not None:
+                male_count += 1
+            else:
+                female_count += 1
+
+        if male_count > female_count:
             return "male"
-        elif len(female_matches) > len(male_matches):
+        elif female_count > male_count:
             return "female"
         else:
             return "unknown"
@@ -176,19 +225,14 @@ class ConversationParser:
         allergies = []
         
         # Look for common phrases that introduce allergies
-        patterns = [
-            r'(?:allergies|allergic to)[:\s]*([^.]+)',
-            r'(?:allergy|allergic)[:\s]*([^.]+)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                # Clean up common negations
-                if "no known" in match.lower() or "nka" in match.lower():
-                    allergies.append("No known allergies")
-                else:
-                    allergies.append(match.strip())
+        for m in self.ALLERGY_PATTERN.finditer(text):
+            match = m.group(1)
+            lowered = match.lower()
+            # Clean up common negations
+            if "no known" in lowered or "nka" in lowered:
+                allergies.append("No known allergies")
+            else:
+                allergies.append(match.strip())
         
         return allergies if allergies else ["None documented"]
     
@@ -197,18 +241,13 @@ class ConversationParser:
         medications = []
         
         # Look for common phrases that introduce medications
-        patterns = [
-            r'(?:medications|meds|taking)[:\s]*([^.]+)',
-            r'(?:prescribed|prescription)[:\s]*([^.]+)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            for match in matches:
-                # Clean up common negations
-                if "no " in match.lower() or "none" in match.lower():
-                    medications.append("No medications")
-                else:
-                    medications.append(match.strip())
+        for m in self.MEDICATION_PATTERN.finditer(text):
+            match = m.group(1)
+            lowered = match.lower()
+            # Clean up common negations
+            if "no " in lowered or "none" in lowered:
+                medications.append("No medications")
+            else:
+                medications.append(match.strip())
         
         return medications if medications else ["None documented"] 
\ No newline at end of file
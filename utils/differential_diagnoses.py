@@ -1,23 +1,35 @@
 import os
 import json
-from datetime import datetime
+import time
+from pathlib import Path
 from utils.query_model import query_model
 
-def generate_differential_diagnoses(case_id, assessment_results, output_dir="differential_diagnoses"):
+# Directories already created this process - skips the stat/mkdir syscalls
+# on every case after the first
+_created_dirs = set()
+
+def _ensure_output_dir(output_dir):
+    """Create the output directory once per process"""
+    if output_dir not in _created_dirs:
+        os.makedirs(output_dir, exist_ok=True)
+        _created_dirs.add(output_dir)
+
+def generate_differential_diagnoses(case_id, assessment_results, output_dir="differential_diagnoses", timestamp=None):
     """
     Generate potential differential diagnoses based on assessment results
-    
+
     Args:
         case_id (str): The case ID
         assessment_results (dict): The assessment results
         output_dir (str): Directory to save the output file
-        
+        timestamp (str, optional): Pre-formatted timestamp so sibling
+            artifacts for the same case can share one
+
     Returns:
         str: Path to the generated file
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
+    _ensure_output_dir(output_dir)
+
     # Get the API key from the environment
     api_key = os.environ.get("OPENAI_API_KEY")
     
@@ -56,7 +68,8 @@ def generate_differential_diagnoses(case_id, assessment_results, output_dir="dif
     )
     
     # Format the output
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if timestamp is None:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
     output = f"""
 DIFFERENTIAL DIAGNOSES
 =====================
@@ -66,9 +79,9 @@ Generated: {timestamp}
 {model_response}
 """
     
-    # Save to file
+    # Save to file - one write call, with an explicit encoding so the
+    # output doesn't depend on the platform locale
     filename = f"{output_dir}/{case_id}_differential_diagnoses_{timestamp}.txt"
-    with open(filename, "w") as f:
-        f.write(output)
-    
+    Path(filename).write_text(output, encoding="utf-8")
+
     return filename 
\ No newline at end of file
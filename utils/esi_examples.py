@@ -1,11 +1,55 @@
 import os
 import json
 import random
+import re
+from collections import defaultdict
+from functools import lru_cache
 
+# One prompt template per agent type - selected once per call instead of
+# branching on agent_type for every example
+_EXAMPLE_TEMPLATES = {
+    "nurse": "ESI LEVEL {level} EXAMPLE:\nPatient Presentation: {scenario}\nAssessment: {answer}\n",
+    "physician": "ESI LEVEL {level} EXAMPLE:\nClinical Scenario: {scenario}\nMedical Assessment: {answer}\n",
+    "consultant": "ESI LEVEL {level} EXAMPLE:\nCase Presentation: {scenario}\nSpecialist Assessment: {answer}\n",
+}
+_DEFAULT_EXAMPLE_TEMPLATE = "ESI LEVEL {level} EXAMPLE:\nScenario: {scenario}\nAssessment: {answer}\n"
+
+# The scenario file is static for the life of the process, so parse and
+# bucket it once; only the sampling step depends on the call arguments
+_ESI_LEVEL_PATTERN = re.compile(r'ESI level ([1-5])')
+_scenarios_by_level = None
+
+def _get_scenarios_by_level():
+    """Load the ESI scenarios and bucket them by level, once per process"""
+    global _scenarios_by_level
+    if _scenarios_by_level is None:
+        file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'agents', 'ESI_scenarios.json')
+
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading ESI scenarios: {e}")
+            return None
+
+        buckets = defaultdict(list)
+        for scenario in data.get('scenarios', []):
+            # Extract ESI level from the answer
+            match = _ESI_LEVEL_PATTERN.search(scenario.get('answer', ''))
+            if match:
+                buckets[match.group(1)].append(scenario)
+        _scenarios_by_level = buckets
+
+    return _scenarios_by_level
+
+@lru_cache(maxsize=32)
 def load_esi_examples(num_per_level=1, seed=42):
     """
     Load ESI scenarios from JSON and select representative examples
-    
+
+    Results are memoized per (num_per_level, seed), so only the first
+    call per combination pays for parsing and sampling.
+
     Args:
         num_per_level (int): Number of examples to select per ESI level
         seed (int): Random seed for reproducible selection
@@ -13,50 +57,22 @@ def load_esi_examples(num_per_level=1, seed=42):
     Returns:
         dict: Dictionary of selected examples organized by ESI level
     """
-    # Set random seed for reproducible selection
-    random.seed(seed)
-    
-    # Load ESI scenarios from JSON
-    file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'agents', 'ESI_scenarios.json')
-    
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"Error loading ESI scenarios: {e}")
+    # Seed a local generator so selection is reproducible without
+    # mutating the global RNG state other callers may rely on
+    rng = random.Random(seed)
+
+    scenarios_by_level = _get_scenarios_by_level()
+    if scenarios_by_level is None:
         return {}
-    
-    # Organize scenarios by ESI level
-    scenarios_by_level = {
-        "1": [],
-        "2": [],
-        "3": [],
-        "4": [],
-        "5": []
-    }
-    
-    for scenario in data.get('scenarios', []):
-        answer = scenario.get('answer', '')
-        # Extract ESI level from the answer
-        if 'ESI level 1' in answer:
-            scenarios_by_level["1"].append(scenario)
-        elif 'ESI level 2' in answer:
-            scenarios_by_level["2"].append(scenario)
-        elif 'ESI level 3' in answer:
-            scenarios_by_level["3"].append(scenario)
-        elif 'ESI level 4' in answer:
-            scenarios_by_level["4"].append(scenario)
-        elif 'ESI level 5' in answer:
-            scenarios_by_level["5"].append(scenario)
-    
+
     # Select examples for each level
     selected_examples = {}
     for level, scenarios in scenarios_by_level.items():
         if scenarios:
             # Select random examples up to the requested number
-            selected = random.sample(scenarios, min(num_per_level, len(scenarios)))
-            selected_examples[level] = selected
-    
+            count = min(num_per_level, len(scenarios))
+            selected_examples[level] = rng.sample(scenarios, count)
+
     return selected_examples
 
 def format_examples_for_prompt(examples, agent_type="nurse"):
@@ -70,21 +86,13 @@ def format_examples_for_prompt(examples, agent_type="nurse"):
     Returns:
         str: Formatted examples text
     """
-    formatted_text = []
-    
-    for level in sorted(examples.keys()):
-        for example in examples[level]:
-            scenario = example.get('scenario', '')
-            answer = example.get('answer', '')
-            
-            # Format the example based on agent type
-            if agent_type == "nurse":
-                formatted_text.append(f"ESI LEVEL {level} EXAMPLE:\nPatient Presentation: {scenario}\nAssessment: {answer}\n")
-            elif agent_type == "physician":
-                formatted_text.append(f"ESI LEVEL {level} EXAMPLE:\nClinical Scenario: {scenario}\nMedical Assessment: {answer}\n")
-            elif agent_type == "consultant":
-                formatted_text.append(f"ESI LEVEL {level} EXAMPLE:\nCase Presentation: {scenario}\nSpecialist Assessment: {answer}\n")
-            else:
-                formatted_text.append(f"ESI LEVEL {level} EXAMPLE:\nScenario: {scenario}\nAssessment: {answer}\n")
-    
-    return "\n".join(formatted_text) 
\ No newline at end of file
+    # Pick the template once; agent_type is constant for the whole call
+    template = _EXAMPLE_TEMPLATES.get(agent_type, _DEFAULT_EXAMPLE_TEMPLATE)
+
+    return "\n".join(
+        template.format(level=level,
+                        scenario=example.get('scenario', ''),
+                        answer=example.get('answer', ''))
+        for level in sorted(examples)
+        for example in examples[level]
+    )
\ No newline at end of file
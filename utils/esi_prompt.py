@@ -0,0 +1,15 @@
+"""Shared ESI reference text for agent system prompts.
+
+The reference block used to be pasted verbatim into each agent's system
+prompt. Keeping a single copy here guarantees the text stays byte-identical
+across agents, which also maximizes provider-side prompt-prefix reuse.
+"""
+
+# Indentation matches the agents' triple-quoted prompt templates so the
+# rendered prompts are unchanged
+ESI_REFERENCE_TEXT = """EMERGENCY SEVERITY INDEX (ESI) REFERENCE:
+        - ESI Level 1: Requires immediate life-saving intervention
+        - ESI Level 2: High-risk situation, severe pain/distress, or vital sign abnormalities
+        - ESI Level 3: Requires multiple resources but stable vital signs
+        - ESI Level 4: Requires one resource
+        - ESI Level 5: Requires no resources"""
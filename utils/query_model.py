@@ -1,13 +1,57 @@
 import os
 import json
+import threading
 import time
+import asyncio
+import random
 import requests
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from openai import OpenAI, AsyncOpenAI, RateLimitError, AuthenticationError, BadRequestError
 
-def query_model(model_str, system_prompt, prompt, openai_api_key=None, max_retries=3, retry_delay=2):
+# Exact-match response cache: identical (model, system prompt, user prompt)
+# triples skip the API call entirely. Bounded FIFO so long runs can't grow
+# it without limit.
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+_RESPONSE_CACHE_MAX = 128
+
+@lru_cache(maxsize=4)
+def _get_client(api_key):
+    """Return a shared OpenAI client for the given API key
+
+    Constructing a client builds a fresh httpx pool and SSL context, so a
+    per-call client pays a new TCP+TLS handshake on every request. Caching
+    one client per key keeps connections warm across calls.
+    """
+    return OpenAI(api_key=api_key)
+
+def _retry_sleep_seconds(error, attempt, retry_delay):
+    """Seconds to wait before the next retry attempt
+
+    Honors the Retry-After header on rate-limit responses; otherwise backs
+    off exponentially with a little jitter so concurrent callers hitting
+    the same limit don't all retry in lockstep.
+    """
+    if isinstance(error, RateLimitError):
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        retry_after = headers.get('Retry-After') if headers else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return retry_delay * (2 ** attempt) + random.uniform(0, 0.5)
+
+@lru_cache(maxsize=4)
+def _get_async_client(api_key):
+    """Return a shared AsyncOpenAI client for the given API key"""
+    return AsyncOpenAI(api_key=api_key)
+
+def query_model(model_str, system_prompt, prompt, openai_api_key=None, max_retries=3, retry_delay=2, use_cache=True, service_tier=None, max_tokens=None):
     """
     Query a language model with the given prompts
-    
+
     Args:
         model_str (str): Model identifier
         system_prompt (str): System prompt
@@ -15,7 +59,13 @@ def query_model(model_str, system_prompt, prompt, openai_api_key=None, max_retri
         openai_api_key (str, optional): API key
         max_retries (int): Maximum number of retries on failure
         retry_delay (int): Delay between retries in seconds
-        
+        use_cache (bool): Reuse cached responses for identical requests
+        service_tier (str, optional): OpenAI service tier (e.g. "priority")
+            for latency-optimized processing; defaults to the
+            OPENAI_SERVICE_TIER environment variable
+        max_tokens (int, optional): Output token budget; decode time scales
+            linearly with tokens emitted, so callers should cap this
+
     Returns:
         str: Model response
     """
@@ -34,20 +84,213 @@ def query_model(model_str, system_prompt, prompt, openai_api_key=None, max_retri
     
     # Use the mapped model name if available, otherwise use the provided model string
     model_name = model_mapping.get(model_str, model_str)
-    
-    return query_openai(model_name, system_prompt, prompt, openai_api_key, max_retries, retry_delay)
 
-def query_openai(model_str, system_prompt, prompt, api_key=None, max_retries=3, retry_delay=2):
+    if use_cache:
+        cache_key = (model_name, system_prompt, prompt)
+        with _response_cache_lock:
+            if cache_key in _response_cache:
+                return _response_cache[cache_key]
+
+    # Allow a deployment-wide latency profile without touching every caller
+    if service_tier is None:
+        service_tier = os.getenv("OPENAI_SERVICE_TIER")
+
+    response = query_openai(model_name, system_prompt, prompt, openai_api_key, max_retries, retry_delay, service_tier, max_tokens)
+
+    if use_cache:
+        with _response_cache_lock:
+            if len(_response_cache) >= _RESPONSE_CACHE_MAX:
+                # Evict the oldest entry (dicts preserve insertion order)
+                _response_cache.pop(next(iter(_response_cache)))
+            _response_cache[cache_key] = response
+
+    return response
+
+def query_model_stream(model_str, system_prompt, prompt, openai_api_key=None, service_tier=None, max_tokens=None):
+    """
+    Query a language model and yield response text chunks as they arrive
+
+    Streaming doesn't change how many tokens are generated, but callers
+    can surface progress (and start buffering the result) from roughly
+    first-token latency instead of waiting for the full response.
+
+    Args:
+        model_str (str): Model identifier
+        system_prompt (str): System prompt
+        prompt (str): User prompt
+        openai_api_key (str, optional): API key
+        service_tier (str, optional): OpenAI service tier; defaults to the
+            OPENAI_SERVICE_TIER environment variable
+        max_tokens (int, optional): Output token budget
+
+    Yields:
+        str: Response text chunks in generation order
+    """
+    if not openai_api_key:
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise ValueError("No OpenAI API key provided. Set OPENAI_API_KEY environment variable.")
+
+    if service_tier is None:
+        service_tier = os.getenv("OPENAI_SERVICE_TIER")
+    if max_tokens is None:
+        max_tokens = 4000
+
+    extra_kwargs = {"service_tier": service_tier} if service_tier else {}
+
+    client = _get_client(openai_api_key)
+
+    if model_str.startswith("o1"):
+        stream = client.chat.completions.create(
+            model=model_str,
+            messages=[
+                {"role": "user", "content": f"{system_prompt}\n\n{prompt}"}
+            ],
+            max_completion_tokens=max_tokens,
+            stream=True,
+            **extra_kwargs
+        )
+    else:
+        stream = client.chat.completions.create(
+            model=model_str,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=max_tokens,
+            stream=True,
+            **extra_kwargs
+        )
+
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def query_model_batch(model_str, system_prompts, prompts, openai_api_key=None, max_retries=3, retry_delay=2):
+    """
+    Query a model with several prompt pairs as one batched dispatch
+
+    Hosted chat APIs have no synchronous multi-prompt endpoint, so the
+    nearest equivalent is firing all requests at once and collecting the
+    responses together - per-request queueing overhead overlaps instead
+    of accumulating.
+
+    Args:
+        model_str (str): Model identifier
+        system_prompts (list): System prompt for each request
+        prompts (list): User prompt for each request
+        openai_api_key (str, optional): API key
+        max_retries (int): Maximum number of retries on failure
+        retry_delay (int): Delay between retries in seconds
+
+    Returns:
+        list: Model responses in the same order as the prompts
+    """
+    with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+        futures = [
+            executor.submit(query_model, model_str, system_prompt, prompt,
+                            openai_api_key, max_retries, retry_delay)
+            for system_prompt, prompt in zip(system_prompts, prompts)
+        ]
+        return [future.result() for future in futures]
+
+async def aquery_openai(model_str, system_prompt, prompt, api_key=None, max_retries=3, retry_delay=2, service_tier=None, max_tokens=None):
+    """Async counterpart of query_openai
+
+    Awaiting the request instead of blocking a thread lets many
+    independent calls share one event loop; the workload is pure network
+    I/O, so this is the cheapest way to overlap them.
+    """
+    if not api_key:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("No OpenAI API key provided. Set OPENAI_API_KEY environment variable.")
+
+    if max_tokens is None:
+        max_tokens = 4000
+
+    extra_kwargs = {"service_tier": service_tier} if service_tier else {}
+
+    client = _get_async_client(api_key)
+
+    for attempt in range(max_retries):
+        try:
+            if model_str.startswith("o1"):
+                response = await client.chat.completions.create(
+                    model=model_str,
+                    messages=[
+                        {"role": "user", "content": f"{system_prompt}\n\n{prompt}"}
+                    ],
+                    max_completion_tokens=max_tokens,
+                    **extra_kwargs
+                )
+            else:
+                response = await client.chat.completions.create(
+                    model=model_str,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.1,
+                    max_tokens=max_tokens,
+                    **extra_kwargs
+                )
+
+            return response.choices[0].message.content
+
+        except (AuthenticationError, BadRequestError):
+            # Retrying can't fix a bad key or a malformed request
+            raise
+        except Exception as e:
+            if attempt < max_retries - 1:
+                sleep_for = _retry_sleep_seconds(e, attempt, retry_delay)
+                print(f"Error querying OpenAI model: {e}. Retrying in {sleep_for:.1f} seconds...")
+                await asyncio.sleep(sleep_for)
+            else:
+                raise Exception(f"Failed to query OpenAI model after {max_retries} attempts: {e}")
+
+def query_model_many(specs, max_concurrency=8):
+    """
+    Run several independent model queries concurrently on one event loop
+
+    Args:
+        specs (list): Keyword-argument dicts for aquery_openai, one per
+            request (model_str, system_prompt, prompt, ...)
+        max_concurrency (int): Cap on simultaneous in-flight requests so
+            a large batch doesn't trip API rate limits
+
+    Returns:
+        list: Model responses in the same order as the specs
+    """
+    async def _run():
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _one(spec):
+            async with semaphore:
+                return await aquery_openai(**spec)
+
+        return await asyncio.gather(*[_one(spec) for spec in specs])
+
+    return asyncio.run(_run())
+
+def query_openai(model_str, system_prompt, prompt, api_key=None, max_retries=3, retry_delay=2, service_tier=None, max_tokens=None):
     """Query OpenAI models"""
     if not api_key:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("No OpenAI API key provided. Set OPENAI_API_KEY environment variable.")
-    
+
+    if max_tokens is None:
+        max_tokens = 4000
+
+    # Only send service_tier when requested so default deployments are unaffected
+    extra_kwargs = {"service_tier": service_tier} if service_tier else {}
+
+    client = _get_client(api_key)
+
     for attempt in range(max_retries):
         try:
-            client = OpenAI(api_key=api_key)
-            
             # For o1 models, we need to use a different format and parameters
             if model_str.startswith("o1"):
                 response = client.chat.completions.create(
@@ -55,8 +298,9 @@ def query_openai(model_str, system_prompt, prompt, api_key=None, max_retries=3,
                     messages=[
                         {"role": "user", "content": f"{system_prompt}\n\n{prompt}"}
                     ],
-                    max_completion_tokens=4000  # Use max_completion_tokens instead of max_tokens
+                    max_completion_tokens=max_tokens,  # Use max_completion_tokens instead of max_tokens
                     # No temperature parameter for o1 models - they only support the default
+                    **extra_kwargs
                 )
             else:
                 response = client.chat.completions.create(
@@ -66,14 +310,19 @@ def query_openai(model_str, system_prompt, prompt, api_key=None, max_retries=3,
                         {"role": "user", "content": prompt}
                     ],
                     temperature=0.1,
-                    max_tokens=4000
+                    max_tokens=max_tokens,
+                    **extra_kwargs
                 )
             
             return response.choices[0].message.content
             
+        except (AuthenticationError, BadRequestError):
+            # Retrying can't fix a bad key or a malformed request
+            raise
         except Exception as e:
             if attempt < max_retries - 1:
-                print(f"Error querying OpenAI model: {e}. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
+                sleep_for = _retry_sleep_seconds(e, attempt, retry_delay)
+                print(f"Error querying OpenAI model: {e}. Retrying in {sleep_for:.1f} seconds...")
+                time.sleep(sleep_for)
             else:
                 raise Exception(f"Failed to query OpenAI model after {max_retries} attempts: {e}")
\ No newline at end of file
@@ -1,29 +1,15 @@
 import os
-from datetime import datetime
+import time
+from pathlib import Path
 
-def generate_quick_reference(case_id, esi_level, confidence, actions, chief_complaint=None, output_dir="quick_ref"):
-    """
-    Generate a quick reference file for nurses
-    
-    Args:
-        case_id (str): The case ID
-        esi_level (str): The ESI level (1-5)
-        confidence (int): Confidence level (0-100)
-        actions (list): List of recommended actions
-        chief_complaint (str, optional): Chief complaint
-        output_dir (str): Directory to save the output file
-        
-    Returns:
-        str: Path to the generated file
-    """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Format the quick reference
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Create a more subtle header
-    output = f"""# Emergency Triage - Quick Reference
+# Directories already created this process - skips the stat/mkdir syscalls
+# on every case after the first
+_created_dirs = set()
+
+# The document shape is fixed, so the whole file renders from one
+# template in a single format pass; optional sections are pre-built
+# substrings (empty when absent)
+_QUICK_REF_TEMPLATE = """# Emergency Triage - Quick Reference
 
 **Case ID:** {case_id}  
 **Generated:** {timestamp}
@@ -31,19 +17,10 @@ def generate_quick_reference(case_id, esi_level, confidence, actions, chief_comp
 ## ESI LEVEL: {esi_level}
 **Confidence:** {confidence}%
 
-"""
-    
-    # Add chief complaint if available
-    if chief_complaint:
-        output += f"**Chief Complaint:** {chief_complaint}\n\n"
-    
-    # Add recommended actions
-    output += "## Recommended Actions:\n\n"
-    for i, action in enumerate(actions, 1):
-        output += f"{i}. {action}\n"
-    
-    # Add ESI level descriptions for reference
-    output += """
+{chief_complaint_block}## Recommended Actions:
+
+{actions_block}
+
 ## ESI Level Reference:
 - **Level 1:** Requires immediate life-saving intervention
 - **Level 2:** High risk situation; severe pain/distress
@@ -51,10 +28,51 @@ def generate_quick_reference(case_id, esi_level, confidence, actions, chief_comp
 - **Level 4:** Requires one resource
 - **Level 5:** Requires no resources
 """
+
+def _ensure_output_dir(output_dir):
+    """Create the output directory once per process"""
+    if output_dir not in _created_dirs:
+        os.makedirs(output_dir, exist_ok=True)
+        _created_dirs.add(output_dir)
+
+def generate_quick_reference(case_id, esi_level, confidence, actions, chief_complaint=None, output_dir="quick_ref", timestamp=None):
+    """
+    Generate a quick reference file for nurses
+
+    Args:
+        case_id (str): The case ID
+        esi_level (str): The ESI level (1-5)
+        confidence (int): Confidence level (0-100)
+        actions (list): List of recommended actions
+        chief_complaint (str, optional): Chief complaint
+        output_dir (str): Directory to save the output file
+        timestamp (str, optional): Pre-formatted timestamp so sibling
+            artifacts for the same case can share one
+
+    Returns:
+        str: Path to the generated file
+    """
+    _ensure_output_dir(output_dir)
+
+    # Format the quick reference
+    if timestamp is None:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
     
-    # Save to file
+    # Render the fixed-shape document in a single format pass
+    chief_complaint_block = f"**Chief Complaint:** {chief_complaint}\n\n" if chief_complaint else ""
+    actions_block = "\n".join(f"{i}. {action}" for i, action in enumerate(actions, 1))
+    output = _QUICK_REF_TEMPLATE.format(
+        case_id=case_id,
+        timestamp=timestamp,
+        esi_level=esi_level,
+        confidence=confidence,
+        chief_complaint_block=chief_complaint_block,
+        actions_block=actions_block,
+    )
+
+    # Save to file - one write call, with an explicit encoding so the
+    # output doesn't depend on the platform locale
     filename = f"{output_dir}/{case_id}_quick_ref_{timestamp}.txt"
-    with open(filename, "w") as f:
-        f.write(output)
-    
+    Path(filename).write_text(output, encoding="utf-8")
+
     return filename
\ No newline at end of file
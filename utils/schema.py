@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
+from pydantic import BaseModel, model_validator
 from typing import List, Optional
 
 class TriageAssessment(BaseModel):
@@ -34,6 +35,12 @@ class ConsultantAssessment(BaseModel):
     additional_insights: str
     summary: str
 
+class BatchedAssessments(BaseModel):
+    """Pydantic model for all three Round 1 assessments from one call"""
+    triage_nurse: TriageAssessment
+    emergency_physician: EmergencyAssessment
+    medical_consultant: ConsultantAssessment
+
 class ESIResult(BaseModel):
     """Pydantic model for final ESI classification"""
     level: str
@@ -55,23 +62,41 @@ class ConsensusResult(BaseModel):
     clinical_justification: str
     justification: str
     recommended_actions: List[str]
-    
 
-class ClinicalData(BaseModel):
-    """Pydantic model for patient clinical data"""
-    age: Optional[str]
-    gender: Optional[str]
-    chief_complaint: Optional[str]
-    vital_signs: Optional[dict]
-    symptoms: Optional[List[str]]
-    medical_history: Optional[List[str]]
-    allergies: Optional[List[str]]
-    medications: Optional[List[str]]
+    @model_validator(mode="before")
+    @classmethod
+    def _mirror_justification(cls, data):
+        # Responses carry either justification key; mirror whichever is
+        # present so a raw model response validates in one pass
+        if isinstance(data, dict):
+            if 'justification' not in data and 'clinical_justification' in data:
+                data['justification'] = data['clinical_justification']
+            elif 'clinical_justification' not in data and 'justification' in data:
+                data['clinical_justification'] = data['justification']
+        return data
+
+
+# ClinicalData and AgentAssessments are in-process containers, never sent
+# through the structured-output API, so they don't need pydantic's
+# per-field validation on every construction. Plain slotted dataclasses
+# build faster and read fields without a dict lookup.
+@dataclass(slots=True)
+class ClinicalData:
+    """Container for patient clinical data"""
+    age: Optional[str] = None
+    gender: Optional[str] = None
+    chief_complaint: Optional[str] = None
+    vital_signs: Optional[dict] = None
+    symptoms: Optional[List[str]] = None
+    medical_history: Optional[List[str]] = None
+    allergies: Optional[List[str]] = None
+    medications: Optional[List[str]] = None
 
-class AgentAssessments(BaseModel):
-    """Pydantic model for collecting assessments from all agents"""
-    triage_nurse: Optional[TriageAssessment]
-    emergency_physician: Optional[EmergencyAssessment]
-    medical_consultant: Optional[ConsultantAssessment]
-    esi_result: Optional[ESIResult]
-    clinical_data: Optional[ClinicalData] 
\ No newline at end of file
+@dataclass(slots=True)
+class AgentAssessments:
+    """Container for collecting assessments from all agents"""
+    triage_nurse: Optional[TriageAssessment] = None
+    emergency_physician: Optional[EmergencyAssessment] = None
+    medical_consultant: Optional[ConsultantAssessment] = None
+    esi_result: Optional[ESIResult] = None
+    clinical_data: Optional[ClinicalData] = None 
\ No newline at end of file
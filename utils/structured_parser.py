@@ -1,13 +1,57 @@
 from pydantic import BaseModel
 from openai import OpenAI
+from functools import lru_cache
 import json
 import os
 from dotenv import load_dotenv
 
+# orjson parses several times faster than stdlib json; fall back
+# silently when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Strict mode rejects object schemas that don't set
+# additionalProperties: false, which plain model_json_schema() doesn't
+# emit. The SDK's own transform (the one beta...parse ran per call) adds
+# it; reuse it here so the cached payload is accepted.
+try:
+    from openai.lib._pydantic import to_strict_json_schema
+except ImportError:
+    to_strict_json_schema = None
+
+@lru_cache(maxsize=32)
+def _schema_for(model_cls):
+    """Build the structured-output response_format for a model class
+
+    Generating a JSON schema walks all of the Pydantic model metadata, so
+    do it once per class instead of letting the SDK redo it per request.
+    """
+    if to_strict_json_schema is not None:
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": model_cls.__name__,
+                "schema": to_strict_json_schema(model_cls),
+                "strict": True,
+            },
+        }
+    # Older SDKs without the transform: fall back to non-strict decoding
+    # rather than sending a schema strict mode would reject
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model_cls.__name__,
+            "schema": model_cls.model_json_schema(),
+            "strict": False,
+        },
+    }
+
 def parse_structured_output(
     text,
     schema_model,
@@ -16,32 +60,35 @@ def parse_structured_output(
 ):
     """
     Parse text input using GPT-4 to extract structured information based on a Pydantic model.
-    
+
     Args:
         text (str): The input text to parse
         schema_model (Type[T]): The Pydantic model class defining the structure
         system_prompt (str): Custom system prompt for the model
         model (str): The OpenAI model to use
-        
+
     Returns:
         T: An instance of the provided Pydantic model with extracted information
-        
+
     Example:
         class Person(BaseModel):
             name: str
             age: int
-            
+
         text = "John is 25 years old"
         result = parse_structured_output(text, Person)
     """
-    
-    completion = client.beta.chat.completions.parse(
+
+    completion = client.chat.completions.create(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": text},
         ],
-        response_format=schema_model,
+        response_format=_schema_for(schema_model),
     )
-    
-    return json.loads(completion.choices[0].message.parsed.model_dump_json())
+
+    content = completion.choices[0].message.content
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)